@@ -0,0 +1,218 @@
+"""
+Synthetic Steam responses shaped like the recorded ones, used by the benchmarks.
+Every generator is deterministic so that runs can be compared with each other.
+"""
+import json
+
+
+HISTORY_ROW_TEMPLATE = '''
+<div class="market_listing_row market_recent_listing_row" id="history_row_{listing_id}_{event_id}">
+\t<div class="market_listing_left_cell market_listing_gainorloss">
+\t\t{sign}\t</div>
+\t<img id="history_row_{listing_id}_{event_id}_image" src="https://steamcommunity-a.akamaihd.net/economy/image/{listing_id}/62fx62f" style="border-color: #D2D2D2;" class="market_listing_item_img" alt="" />
+\t<div class="market_listing_right_cell market_listing_listed_date can_combine">
+\t\t{acted_on}\t</div>
+\t<div class="market_listing_right_cell market_listing_listed_date can_combine">
+\t\t{listed_on}\t</div>
+\t<div class="market_listing_right_cell market_listing_whoactedwith can_combine">
+{acted_with}\t</div>
+\t<div class="market_listing_right_cell market_listing_their_price">
+\t\t<span class="market_table_value">
+\t\t\t<span class="market_listing_price">
+\t\t\t\t{price}\t\t\t</span>
+\t\t</span>
+\t</div>
+\t<div class="market_listing_item_name_block">
+\t\t<span id="history_row_{listing_id}_{event_id}_name" class="market_listing_item_name" style="color: #D2D2D2;">{item_name}</span>
+\t\t<br/>
+\t\t<span class="market_listing_game_name">Counter-Strike 2</span>
+\t</div>
+\t<div style="clear: both"></div>
+</div>
+'''
+
+HISTORY_USER_TEMPLATE = '''\t\t<span class="market_listing_owner_avatar">
+\t\t\t<span class="playerAvatar offline">
+\t\t\t\t<a href="https://steamcommunity.com/profiles/{steam_id}">
+\t\t\t\t\t<img src="https://avatars.akamai.steamstatic.com/{steam_id}.jpg" alt="" />
+\t\t\t\t</a>
+\t\t\t</span>
+\t\t</span>
+\t\t<div class="market_listing_whoactedwith_name_block">
+\t\t\t{role}:<br/>
+\t\t\tplayer_{steam_id}\t\t</div>
+'''
+
+HISTORY_HOVER_TEMPLATE = "\tCreateItemHoverFromContainer( g_rgAssets, " \
+                         "'history_row_{listing_id}_{event_id}_name', 730, '2', '{asset_id}', 0 );\r\n"
+
+EVENTS = ['\t\tListing created\t', '\t\tListing canceled\t', '\t\tListing expired\t', None, None]
+
+
+def market_history_response(rows: int = 100, start: int = 0) -> dict:
+    """ A '/market/myhistory/render/' response with 'rows' rows, 2 out of 5 being purchases or sales """
+    html_rows = []
+    hovers = []
+    assets = {}
+    for index in range(start, start + rows):
+        listing_id = 4000000000000000000 + index
+        event_id = index % 7
+        asset_id = 20000000000 + index
+        event = EVENTS[index % len(EVENTS)]
+        sign = '+' if index % 2 else '-'
+        if event is None:
+            acted_with = HISTORY_USER_TEMPLATE.format(steam_id=76561198000000000 + index,
+                                                      role='Seller' if sign == '+' else 'Buyer')
+        else:
+            acted_with = event
+            sign = ''
+        html_rows.append(HISTORY_ROW_TEMPLATE.format(listing_id=listing_id, event_id=event_id, sign=sign,
+                                                     acted_on='%d Jan' % (1 + index % 28),
+                                                     listed_on='%d Dec' % (1 + index % 28),
+                                                     acted_with=acted_with,
+                                                     price='$%d.%02d' % (index % 100, index % 97),
+                                                     item_name='AK-47 | Redline (Field-Tested) #%d' % index))
+        hovers.append(HISTORY_HOVER_TEMPLATE.format(listing_id=listing_id, event_id=event_id, asset_id=asset_id))
+        assets[str(asset_id)] = {'appid': 730, 'contextid': '2', 'id': str(asset_id), 'classid': str(index % 50),
+                                 'instanceid': '0', 'amount': '0', 'status': 4,
+                                 'market_hash_name': 'AK-47 | Redline (Field-Tested)'}
+    html = '<div id="tabContentsMyMarketHistoryRows">' + ''.join(html_rows) + '</div>\r\n' + \
+           '<script type="text/javascript">\r\n' + ''.join(hovers) + '</script>\r\n'
+    return {'success': True, 'pagesize': rows, 'total_count': 100000, 'start': start,
+            'assets': {'730': {'2': assets}}, 'hovers': ''.join(hovers), 'results_html': '', 'result_html': html}
+
+
+def description(index: int, appid: int = 730) -> dict:
+    return {'appid': appid, 'classid': str(index), 'instanceid': '0', 'icon_url': 'icon_%d' % index,
+            'name': 'AK-47 | Redline #%d' % index, 'market_hash_name': 'AK-47 | Redline (Field-Tested)',
+            'type': 'Classified Rifle', 'tradable': 1, 'marketable': 1, 'commodity': 0,
+            'descriptions': [{'type': 'html', 'value': 'Exterior: Field-Tested'}],
+            'tags': [{'category': 'Rarity', 'internal_name': 'Rarity_Legendary_Weapon', 'name': 'Classified'}]}
+
+
+def asset(index: int, classes: int) -> dict:
+    return {'appid': 730, 'contextid': '2', 'assetid': str(10000000000 + index), 'classid': str(index % classes),
+            'instanceid': '0', 'amount': '1'}
+
+
+def legacy_inventory_response(items: int = 2000, classes: int = 200) -> dict:
+    """ A '/profiles/<steam id>/inventory/json/' response (rgInventory / rgDescriptions) """
+    inventory = {}
+    for index in range(items):
+        item = asset(index, classes)
+        inventory[item['assetid']] = {'id': item['assetid'], 'classid': item['classid'], 'instanceid': '0',
+                                      'amount': '1', 'pos': index + 1}
+    descriptions = {'%d_0' % index: description(index) for index in range(classes)}
+    return {'success': True, 'rgInventory': inventory, 'rgDescriptions': descriptions}
+
+
+def inventory_response(items: int = 2000, classes: int = 200, start: int = 0, total: int = None) -> dict:
+    """ A '/inventory/<steam id>/<app id>/<context id>' page """
+    total = total if total is not None else items
+    assets = [asset(index, classes) for index in range(start, min(start + items, total))]
+    response = {'assets': assets, 'descriptions': [description(index) for index in range(classes)],
+                'total_inventory_count': total, 'success': 1, 'rwgrsn': -2}
+    if start + items < total:
+        response.update(more_items=1, last_assetid=assets[-1]['assetid'])
+    return response
+
+
+def trade_offer(offer_id: int, items: int = 5, classes: int = 50, is_our_offer: bool = False) -> dict:
+    return {'tradeofferid': str(offer_id), 'accountid_other': 40000000 + offer_id % 1000, 'message': '',
+            'expiration_time': 1700000000, 'trade_offer_state': 2,
+            'items_to_give': [asset(offer_id * items + index, classes) for index in range(items)],
+            'items_to_receive': [asset(offer_id * items + index + 1000000, classes) for index in range(items)],
+            'is_our_offer': is_our_offer, 'time_created': 1690000000, 'time_updated': 1690000000,
+            'from_real_time_trade': False, 'escrow_end_date': 0, 'confirmation_method': 0}
+
+
+def trade_offers_response(offers: int = 50, items: int = 5, classes: int = 50) -> dict:
+    """ An IEconService/GetTradeOffers/v1 response with descriptions """
+    return {'response': {'trade_offers_received': [trade_offer(index, items, classes) for index in range(offers)],
+                         'trade_offers_sent': [],
+                         'descriptions': [description(index) for index in range(classes)],
+                         'next_cursor': 0}}
+
+
+MARKET_PAGE_TEMPLATE = '''<html><body>
+<div id="myListings">
+<div class="my_listing_section market_content_block market_home_listing_table">
+<h3 class="my_market_header"><span class="my_market_header_active">My sell listings</span>
+(<span id="my_market_selllistings_number">{count}</span>)</h3>
+{sell_listings}
+</div>
+<div class="my_listing_section market_content_block market_home_listing_table">
+<h3 class="my_market_header"><span class="my_market_header_active">My buy orders</span></h3>
+{buy_orders}
+</div>
+</div>
+<span id="tabContentsMyActiveMarketListings_end">{count}</span>
+<span id="tabContentsMyActiveMarketListings_total">{count}</span>
+<script type="text/javascript">
+\tvar g_rgAssets = {assets};\r
+{hovers}</script>
+</body></html>'''
+
+SELL_LISTING_TEMPLATE = '''<div class="market_listing_row market_recent_listing_row listing_{listing_id}" id="mylisting_{listing_id}">
+\t<div class="market_listing_right_cell market_listing_my_price"><span class="market_table_value">
+\t\t<span class="market_listing_price"><span title="This is the price the buyer pays.">\t${buyer_pay}\t</span>
+\t\t<span title="This is how much you will receive.">\t(${you_receive})\t</span></span></span></div>
+\t<div class="market_listing_right_cell market_listing_listed_date can_combine">\t\t1 Jan\t</div>
+\t<span id="mylisting_{listing_id}_name" class="market_listing_item_name">AK-47 | Redline #{index}</span>
+</div>
+'''
+
+BUY_ORDER_TEMPLATE = '''<div class="market_listing_row market_recent_listing_row" id="mybuyorder_{order_id}">
+\t<span class="market_listing_price">\t\t{quantity} @\t\t${price}\t</span>
+\t<a class="market_listing_item_name_link" href="https://steamcommunity.com/market/listings/730/x">Case #{index}</a>
+</div>
+'''
+
+SELL_LISTING_HOVER_TEMPLATE = "\tCreateItemHoverFromContainer( g_rgAssets, 'mylisting_{listing_id}_name', 730, '2', " \
+                              "'{asset_id}', 0 );\r\n"
+
+
+def market_page(sell_listings: int = 100, buy_orders: int = 20) -> str:
+    """ The '/market' page with its sell listings and buy orders """
+    listings_html = []
+    hovers = []
+    assets = {}
+    for index in range(sell_listings):
+        listing_id = 3000000000000000000 + index
+        asset_id = 20000000000 + index
+        listings_html.append(SELL_LISTING_TEMPLATE.format(listing_id=listing_id, index=index,
+                                                          buyer_pay='%d.%02d' % (index + 1, index % 100),
+                                                          you_receive='%d.%02d' % (index, index % 100)))
+        hovers.append(SELL_LISTING_HOVER_TEMPLATE.format(listing_id=listing_id, asset_id=asset_id))
+        item = description(index % 50)
+        item.update(id=str(asset_id), contextid='2', amount='1', status=2)
+        assets[str(asset_id)] = item
+    orders_html = [BUY_ORDER_TEMPLATE.format(order_id=5000000 + index, index=index, quantity=index % 5 + 1,
+                                             price='%d.%02d' % (index, index % 100)) for index in range(buy_orders)]
+    return MARKET_PAGE_TEMPLATE.format(count=sell_listings, sell_listings=''.join(listings_html),
+                                       buy_orders=''.join(orders_html), assets=json.dumps({'730': {'2': assets}}),
+                                       hovers=''.join(hovers))
+
+
+CONFIRMATION_TEMPLATE = '''<div class="mobileconf_list_entry" id="conf{confirmation_id}" data-confid="{confirmation_id}"
+ data-key="{key}" data-type="2" data-creator="{offer_id}" data-cancel="Cancel" data-accept="Accept">
+\t<div class="mobileconf_list_entry_content"><div class="mobileconf_list_entry_description">
+\t\t<div>Trade with partner</div><div>{offer_id}</div></div></div>
+</div>
+'''
+
+
+def confirmations_page(confirmations: list) -> str:
+    """ The '/mobileconf/conf' page listing (confirmation id, trade offer id) pairs """
+    if not confirmations:
+        return '<html><body><div id="mobileconf_empty" class="mobileconf_done">Nothing to confirm</div></body></html>'
+    entries = [CONFIRMATION_TEMPLATE.format(confirmation_id=confirmation_id, key=confirmation_id * 7,
+                                            offer_id=offer_id) for confirmation_id, offer_id in confirmations]
+    return '<html><body><div id="mobileconf_list">' + ''.join(entries) + '</div></body></html>'
+
+
+def confirmation_details(trade_offer_id: str) -> dict:
+    """ The '/mobileconf/details/<confirmation id>' response of a trade offer confirmation """
+    html = '<div class="mobileconf_trade_area"><div class="tradeoffer" id="tradeofferid_%s">' \
+           '<div class="tradeoffer_partner"></div><div class="tradeoffer_items_ctn"></div></div></div>' % trade_offer_id
+    return {'success': True, 'html': html}
@@ -0,0 +1,63 @@
+"""
+Timing helpers shared by the benchmarks: ops/s, latency percentiles and peak memory of a callable.
+"""
+import time
+import tracemalloc
+
+
+class Result:
+    def __init__(self, name: str, latencies: list, elapsed: float, peak_memory: int) -> None:
+        self.name = name
+        self.latencies = sorted(latencies)
+        self.elapsed = elapsed
+        self.peak_memory = peak_memory
+
+    @property
+    def ops_per_second(self) -> float:
+        return len(self.latencies) / self.elapsed
+
+    def percentile(self, q: float) -> float:
+        return self.latencies[min(len(self.latencies) - 1, int(q * len(self.latencies)))]
+
+    def to_dict(self) -> dict:
+        return {'name': self.name,
+                'ops': len(self.latencies),
+                'ops_per_second': self.ops_per_second,
+                'p50_ms': self.percentile(0.5) * 1000,
+                'p90_ms': self.percentile(0.9) * 1000,
+                'p99_ms': self.percentile(0.99) * 1000,
+                'peak_memory_kb': self.peak_memory / 1024}
+
+    def __str__(self) -> str:
+        return '%(name)-32s %(ops_per_second)10.1f ops/s  p50 %(p50_ms)8.2f ms  p90 %(p90_ms)8.2f ms  ' \
+               'p99 %(p99_ms)8.2f ms  peak %(peak_memory_kb)9.0f KiB' % self.to_dict()
+
+
+def measure(name: str, operation, setup=None, duration: float = 1.0, min_ops: int = 5,
+            memory_ops: int = 3) -> Result:
+    """
+    Call 'operation(setup())' (or 'operation()' without setup) for at least 'duration' seconds and 'min_ops' times,
+    only the operation is timed. Peak memory is measured with tracemalloc over 'memory_ops' other calls, so that
+    tracing does not slow the timed ones down.
+    """
+    arguments = (lambda: (setup(),)) if setup is not None else (lambda: ())
+    operation(*arguments())  # warm up caches and connections
+    latencies = []
+    elapsed = 0.0
+    while elapsed < duration or len(latencies) < min_ops:
+        args = arguments()
+        started = time.perf_counter()
+        operation(*args)
+        latency = time.perf_counter() - started
+        latencies.append(latency)
+        elapsed += latency
+    peak_memory = 0
+    for _ in range(memory_ops):
+        args = arguments()
+        tracemalloc.start()
+        try:
+            operation(*args)
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return Result(name, latencies, elapsed, peak_memory)
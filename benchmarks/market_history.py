@@ -0,0 +1,35 @@
+"""
+Rows per second of SteamMarket._get_market_history_from_json for every available parser backend.
+
+    python -m benchmarks.market_history [rows per page] [pages]
+"""
+import sys
+import time
+
+from steampy.parsers import BeautifulSoupMarketHistoryParser, LxmlMarketHistoryParser, lxml
+from steampy.market import SteamMarket
+
+from .fixtures import market_history_response
+
+
+def benchmark(parser, responses: list) -> float:
+    started = time.perf_counter()
+    rows = 0
+    for response in responses:
+        rows += len(SteamMarket._get_market_history_from_json(response, parser)['listings'])
+    return rows / (time.perf_counter() - started)
+
+
+def main(rows_per_page: int = 100, pages: int = 20) -> None:
+    responses = [market_history_response(rows_per_page, page * rows_per_page) for page in range(pages)]
+    parsers = [BeautifulSoupMarketHistoryParser()]
+    if lxml is not None:
+        parsers.append(LxmlMarketHistoryParser())
+        reference = parsers[0].parse(responses[0])
+        assert parsers[1].parse(responses[0]) == reference, 'parsers disagree'
+    for parser in parsers:
+        print('%-35s %10.0f rows/s' % (type(parser).__name__, benchmark(parser, responses)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
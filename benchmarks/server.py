@@ -0,0 +1,186 @@
+"""
+Local stand-in for the Steam hosts used by the end to end benchmarks.
+SteamStandIn serves the fixtures over http on localhost; StandInAdapter, mounted on a SteamSession, sends the
+requests meant for Steam to it. Cookies are still stored for the Steam domains.
+"""
+import base64
+import itertools
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import rsa
+from requests.adapters import HTTPAdapter
+
+from . import fixtures
+
+STEAM_HOST_HEADER = 'X-Steam-Host'
+
+STEAM_ID = '76561198000000001'
+STEAM_GUARD = {'steamid': STEAM_ID,
+               'shared_secret': base64.b64encode(b'benchmark shared secret').decode(),
+               'identity_secret': base64.b64encode(b'benchmark identity secret').decode()}
+
+
+class StandInAdapter(HTTPAdapter):
+    """ Rewrites every request to 'base_url', the original host goes in the X-Steam-Host header """
+
+    def __init__(self, base_url: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request = request.copy()
+        request.headers[STEAM_HOST_HEADER] = parts.netloc
+        request.url = self.base_url + parts.path + ('?' + parts.query if parts.query else '')
+        return super().send(request, **kwargs)
+
+
+class SteamStandIn:
+    """
+    Threaded http server answering like Steam for login, inventory, IEconService, market and mobileconf.
+    Sent and accepted offers wait for a mobile confirmation until they are confirmed through ajaxop / multiajaxop.
+    """
+
+    def __init__(self, inventory_items: int = 2000, offers: int = 50, sell_listings: int = 100,
+                 history_rows: int = 100) -> None:
+        public_key, _ = rsa.newkeys(512)
+        self.rsa_key = {'success': True, 'publickey_mod': '%x' % public_key.n, 'publickey_exp': '%x' % public_key.e,
+                        'timestamp': '1000000000'}
+        self.inventory_items = inventory_items
+        self.offers_response = json.dumps(fixtures.trade_offers_response(offers)).encode()
+        self.market_page = fixtures.market_page(sell_listings).encode()
+        self.market_history = json.dumps(fixtures.market_history_response(history_rows)).encode()
+        self.pending = {}  # confirmation id: trade offer id
+        self.requests = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._create_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return 'http://%s:%d' % self._server.server_address
+
+    def adapter(self, **kwargs) -> StandInAdapter:
+        return StandInAdapter(self.base_url, **kwargs)
+
+    def start(self) -> 'SteamStandIn':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'SteamStandIn':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def add_confirmation(self, trade_offer_id: str) -> None:
+        with self._lock:
+            self.pending[next(self._ids)] = trade_offer_id
+
+    def route(self, method: str, host: str, path: str, query: dict, form: dict) -> tuple:
+        """ Return (status code, body, extra headers) """
+        self.requests += 1
+        if path == '/login/getrsakey/':
+            return self._json(self.rsa_key)
+        if path == '/login/dologin':
+            response = {'success': True, 'requires_twofactor': False, 'login_complete': True,
+                        'transfer_urls': ['https://steamcommunity.com/login/transfer',
+                                          'https://help.steampowered.com/login/transfer'],
+                        'transfer_parameters': {'steamid': STEAM_ID, 'token_secure': 'token', 'auth': 'auth'}}
+            return self._json(response, {'Set-Cookie': 'sessionid=0123456789abcdef01234567; Path=/'})
+        if path == '/login/transfer':
+            return self._json({'success': True})
+        if path.startswith('/inventory/'):
+            # asset ids of the fixture are 10000000000 + their index
+            start = int(query['start_assetid'][0]) - 10000000000 + 1 if 'start_assetid' in query else 0
+            count = int(query.get('count', ['5000'])[0])
+            return self._json(fixtures.inventory_response(count, start=start, total=self.inventory_items))
+        if path == '/IEconService/GetTradeOffers/v1':
+            return 200, self.offers_response, {}
+        if path == '/IEconService/GetTradeOffer/v1':
+            offer = fixtures.trade_offer(int(query['tradeofferid'][0]))
+            return self._json({'response': {'offer': offer, 'descriptions': []}})
+        if path == '/IEconService/GetTradeHoldDurations/v1':
+            escrow = {'escrow_end_duration_seconds': 0}
+            return self._json({'response': {'my_escrow': escrow, 'their_escrow': escrow, 'both_escrow': escrow}})
+        if path == '/IEconService/GetTradeOffersSummary/v1':
+            return self._json({'response': {'pending_received_count': 0, 'new_received_count': 0}})
+        if path == '/tradeoffer/new/send':
+            trade_offer_id = str(next(self._ids) + 6000000000)
+            self.add_confirmation(trade_offer_id)
+            return self._json({'tradeofferid': trade_offer_id, 'needs_mobile_confirmation': True})
+        if path.startswith('/tradeoffer/') and path.endswith('/accept'):
+            self.add_confirmation(path.split('/')[2])
+            return self._json({'needs_mobile_confirmation': True})
+        if path == '/market' or path == '/market/':
+            return 200, self.market_page, {'Content-Type': 'text/html; charset=utf-8'}
+        if path == '/market/myhistory/render/':
+            return 200, self.market_history, {}
+        if path == '/market/priceoverview/':
+            return self._json({'success': True, 'lowest_price': '$1.23 USD', 'volume': '1,234',
+                               'median_price': '$1.25 USD'})
+        if path == '/mobileconf/conf':
+            with self._lock:
+                page = fixtures.confirmations_page(list(self.pending.items()))
+            return 200, page.encode(), {'Content-Type': 'text/html; charset=utf-8'}
+        if path.startswith('/mobileconf/details/'):
+            with self._lock:
+                trade_offer_id = self.pending.get(int(path.rsplit('/', 1)[1]))
+            if trade_offer_id is None:
+                return self._json({'success': False})
+            return self._json(fixtures.confirmation_details(trade_offer_id))
+        if path in ('/mobileconf/ajaxop', '/mobileconf/multiajaxop'):
+            ids = query.get('cid') or form.get('cid[]') or []
+            with self._lock:
+                success = all([self.pending.pop(int(confirmation_id), None) for confirmation_id in ids])
+            return self._json({'success': success})
+        return 404, ('No stand-in for %s %s%s' % (method, host, path)).encode(), {}
+
+    @staticmethod
+    def _json(response: dict, headers: dict = None) -> tuple:
+        return 200, json.dumps(response).encode(), dict(headers or {}, **{'Content-Type': 'application/json'})
+
+    def _create_handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # headers and body are written separately, without TCP_NODELAY keep-alive responses wait for delayed acks
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self._answer('GET', {})
+
+            def do_HEAD(self):
+                self._answer('HEAD', {})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self._answer('POST', parse_qs(self.rfile.read(length).decode()))
+
+            def _answer(self, method: str, form: dict) -> None:
+                parts = urlsplit(self.path)
+                status, body, headers = stand_in.route(method, self.headers.get(STEAM_HOST_HEADER, ''), parts.path,
+                                                       parse_qs(parts.query), form)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if method != 'HEAD':
+                    self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,100 @@
+"""
+Offline benchmarks of the steampy hot paths: ops/s, latency percentiles and peak memory.
+Parsers run on the fixtures, end to end benchmarks talk to SteamStandIn on localhost with the rate limiter disabled,
+so they measure steampy and not Steam.
+
+    python -m benchmarks.suite [name filters...] [--duration SECONDS] [--json PATH]
+"""
+import argparse
+import itertools
+import json
+
+from steampy.client import SteamClient
+from steampy.confirmation import ConfirmationExecutor
+from steampy.market import SteamMarket
+from steampy.models import Asset, GameOptions
+from steampy.utils import merge_items_with_descriptions_from_inventory, merge_items_with_descriptions_from_offers
+
+from . import fixtures
+from .harness import measure
+from .server import SteamStandIn, STEAM_GUARD
+
+PARTNER_STEAM_ID = '76561198000000002'
+
+
+def create_client(stand_in: SteamStandIn, login: bool = True) -> SteamClient:
+    client = SteamClient('BENCHMARK_API_KEY')
+    client.steam_session.mount('https://', stand_in.adapter())
+    client.steam_session.rate_limiter = None
+    if login:
+        client.login('benchmark', 'password', json.dumps(STEAM_GUARD))
+    return client
+
+
+def parser_benchmarks():
+    """ Yield (name, operation, setup) """
+    inventory = fixtures.legacy_inventory_response(2000)
+    yield ('merge_items_from_inventory', lambda: merge_items_with_descriptions_from_inventory(inventory,
+                                                                                             GameOptions.CS), None)
+    # merging mutates the response, a fresh one is built outside of the timed call
+    yield 'merge_items_from_offers', merge_items_with_descriptions_from_offers, fixtures.trade_offers_response
+    market_page = fixtures.market_page(100)
+    yield 'get_listings_from_html', lambda: SteamMarket._get_listings_from_html(market_page), None
+    market_history = fixtures.market_history_response(100)
+    yield 'get_market_history_from_json', lambda: SteamMarket._get_market_history_from_json(market_history), None
+    confirmations_page = fixtures.confirmations_page([(index, str(index)) for index in range(1, 51)])
+    yield 'get_confirmations_from_html', lambda: ConfirmationExecutor._get_confirmations_from_html(
+        confirmations_page), None
+
+
+def end_to_end_benchmarks(stand_in: SteamStandIn):
+    """ Yield (name, operation, setup) """
+    yield 'login', lambda client: client.login('benchmark', 'password', json.dumps(STEAM_GUARD)), \
+        lambda: create_client(stand_in, login=False)
+    client = create_client(stand_in)
+    yield 'iter_my_inventory', lambda: sum(1 for _ in client.iter_my_inventory(GameOptions.CS, 500)), None
+    yield 'get_trade_offers', lambda: client.get_trade_offers(), None
+    yield 'get_my_market_listings', lambda: client.market.get_my_market_listings(), None
+    yield 'get_market_history', lambda: client.market.get_market_history(100), None
+
+    executor = ConfirmationExecutor(STEAM_GUARD['identity_secret'], client.steam_session.steam_id,
+                                    client.steam_session, client.steam_session.confirmation_cache,
+                                    client.steam_session.guard_keyring)
+    offer_ids = (str(offer_id) for offer_id in itertools.count(7000000000))
+
+    def add_confirmations(count: int) -> list:
+        trade_offer_ids = [next(offer_ids) for _ in range(count)]
+        for trade_offer_id in trade_offer_ids:
+            stand_in.add_confirmation(trade_offer_id)
+        return trade_offer_ids
+
+    yield 'confirm_trade_offer', lambda ids: executor.confirm_trade_offer(ids[0]), lambda: add_confirmations(1)
+    yield 'confirm_many_10', lambda ids: executor.confirm_many(ids), lambda: add_confirmations(10)
+
+    items = [Asset(str(10000000000 + index), GameOptions.CS) for index in range(5)]
+    yield 'send_trade_offer', lambda: client.send_trade_offer(items, [], partner_steam_id=PARTNER_STEAM_ID), None
+    yield 'accept_trade_offer', client.accept_trade_offer, lambda: next(offer_ids)
+
+
+def main() -> None:
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('filters', nargs='*', help='only run the benchmarks whose name contains one of these')
+    arguments.add_argument('--duration', type=float, default=1.0, help='seconds spent on every benchmark')
+    arguments.add_argument('--json', help='also write the results to this file')
+    arguments = arguments.parse_args()
+
+    results = []
+    with SteamStandIn() as stand_in:
+        for name, operation, setup in itertools.chain(parser_benchmarks(), end_to_end_benchmarks(stand_in)):
+            if arguments.filters and not any(name_filter in name for name_filter in arguments.filters):
+                continue
+            result = measure(name, operation, setup, arguments.duration)
+            print(result)
+            results.append(result.to_dict())
+    if arguments.json:
+        with open(arguments.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
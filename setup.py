@@ -23,4 +23,10 @@ setup(
         "beautifulsoup4",
         "rsa"
     ],
+    extras_require={
+        "async": ["aiohttp"],
+        "numpy": ["numpy"],
+        "lxml": ["lxml"],
+        "prometheus": ["prometheus_client"],
+    },
 )
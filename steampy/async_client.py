@@ -0,0 +1,276 @@
+import json
+from typing import List, AsyncIterator
+
+from .async_market import AsyncSteamMarket
+from .async_session import AsyncSteamSession
+from .cache import EscrowCache
+from .async_confirmation import AsyncConfirmationExecutor
+from .client import SteamClient
+from .session import login_required
+from .exceptions import SteamServerError, ParameterError, TradeHoldException
+from .constants import COMMUNITY_URL, STORE_URL
+from .utils import get_partner_from_trade_offer_url, get_token_from_trade_offer_url, account_id_to_steam_id, \
+    steam_id_to_account_id, texts_between, handle_steam_response, extract_json, get_description_key, merge_item
+from .models import GameOptions, Asset
+
+
+class AsyncSteamClient:
+    """
+    asyncio counterpart of SteamClient. Every method that talks to Steam is a coroutine.
+    Install the 'async' extra (aiohttp) to use it.
+    """
+
+    def __init__(self, api_key: str = None, connection_limit: int = 100, escrow_cache: EscrowCache = None) -> None:
+        self.steam_session = AsyncSteamSession(connection_limit)
+        self.market = AsyncSteamMarket(self.steam_session)
+        self.escrow_cache = escrow_cache
+
+        if api_key:
+            self.api_key = api_key
+
+    @property
+    def api_key(self) -> str:
+        return self.steam_session.api_key
+
+    @api_key.setter
+    def api_key(self, api_key: str):
+        self.steam_session.api_key = api_key
+
+    async def login(self, username: str, password: str, steam_guard: str) -> None:
+        await self.steam_session.login(username, password, steam_guard)
+
+    async def relogin(self):
+        await self.steam_session.relogin()
+
+    async def close(self) -> None:
+        await self.steam_session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def is_session_alive(self) -> bool:
+        """ Check if you are still logged in on Steam """
+        url = STORE_URL + "/account/store_transactions/"
+        head_response = await self.steam_session.head(url)
+        return head_response.status_code == 200
+
+    async def get_player_inventory(self, player_steam_id: str, game: GameOptions, count=0) -> dict:
+        """ Return the inventory of the player by steam_id. 'count' can go up to 5000."""
+        url = "%s/inventory/%s/%s/%s/?l=english" % (COMMUNITY_URL, player_steam_id, game.app_id, game.context_id)
+        if count:
+            url = url + "&count=%s" % count
+
+        response = await self.steam_session.get(url)
+        handle_steam_response(response)
+        response_json = extract_json(response)
+        return response_json
+
+    @login_required
+    async def get_my_inventory(self, game: GameOptions, count=0) -> dict:
+        return await self.get_player_inventory(self.steam_session.steam_id, game, count)
+
+    async def iter_inventory(self, player_steam_id: str, game: GameOptions,
+                             page_size: int = 2000) -> AsyncIterator[dict]:
+        """ See SteamClient.iter_inventory """
+        url = "%s/inventory/%s/%s/%s" % (COMMUNITY_URL, player_steam_id, game.app_id, game.context_id)
+        params = {'l': 'english', 'count': page_size}
+        while True:
+            response = await self.steam_session.get(url, params=params)
+            handle_steam_response(response)
+            page = extract_json(response)
+            descriptions = {get_description_key(description): description
+                            for description in page.get('descriptions', [])}
+            for asset in page.get('assets', []):
+                yield merge_item(asset, descriptions)
+            if not page.get('more_items'):
+                return
+            params['start_assetid'] = page['last_assetid']
+
+    @login_required
+    async def send_trade_offer(self,
+                               items_to_give: List[Asset],
+                               items_to_receive: List[Asset],
+                               message: str = None,
+                               partner_steam_id: str = None,
+                               trade_offer_url: str = None,
+                               check_trade_hold=True) -> dict:
+        """ See SteamClient.send_trade_offer """
+        token = None
+        trade_offer_create_params = {}
+        if trade_offer_url:
+            token = get_token_from_trade_offer_url(trade_offer_url)
+            partner_account_id = get_partner_from_trade_offer_url(trade_offer_url)
+            partner_steam_id = account_id_to_steam_id(partner_account_id)
+            trade_offer_create_params["trade_offer_access_token"] = token
+            referer = trade_offer_url
+
+        elif partner_steam_id:
+            partner_account_id = steam_id_to_account_id(partner_steam_id)
+            referer = COMMUNITY_URL + '/tradeoffer/new/?partner=' + partner_account_id
+
+        else:
+            raise ParameterError("A 'trade_offer_url' or a 'partner_steam_id' is needed to use this method")
+
+        if check_trade_hold and await self._get_trade_hold_duration(partner_steam_id, token) != 0:
+            raise TradeHoldException("Offer not sent because items will be on hold")
+
+        offer = SteamClient._create_offer_dict(items_to_give, items_to_receive)
+        params = {
+            'sessionid': self._get_session_id(),
+            'serverid': 1,
+            'partner': partner_steam_id,
+            'tradeoffermessage': message,
+            'json_tradeoffer': json.dumps(offer),
+            'captcha': '',
+            'trade_offer_create_params': json.dumps(trade_offer_create_params)
+        }
+        headers = {'Referer': referer, 'Origin': COMMUNITY_URL}
+
+        response = await self.steam_session.post(COMMUNITY_URL + '/tradeoffer/new/send', data=params,
+                                                 headers=headers)
+        handle_steam_response(response)
+        response_json = extract_json(response)
+
+        if response_json.get('needs_mobile_confirmation'):
+            if "tradeofferid" not in response_json:
+                raise SteamServerError("Steam responded without a 'tradeofferid'")
+
+            confirmation_response_dict = await self._confirm_trade_offer(response_json['tradeofferid'])
+            response_json.update(confirmation_response_dict)
+        return response_json
+
+    @login_required
+    async def accept_trade_offer(self, trade_offer_id: str, partner_steam_id: str = None,
+                                 check_trade_hold=True) -> dict:
+        """ See SteamClient.accept_trade_offer """
+        if check_trade_hold and partner_steam_id and self._is_known_without_trade_hold(partner_steam_id):
+            check_trade_hold = False
+
+        if check_trade_hold or not partner_steam_id:
+            offer = (await self.get_trade_offer(trade_offer_id))["response"]["offer"]
+
+            if not partner_steam_id:
+                partner_steam_id = offer["accountid_other"]
+
+            if check_trade_hold:
+                self._cache_trade_hold(partner_steam_id, offer["escrow_end_date"])
+                if offer["escrow_end_date"] != 0:
+                    raise TradeHoldException("Offer not accepted because items will be put on hold")
+
+        partner_steam_id = account_id_to_steam_id(partner_steam_id)
+        accept_url = COMMUNITY_URL + '/tradeoffer/' + trade_offer_id + '/accept'
+        params = {'sessionid': self._get_session_id(),
+                  'tradeofferid': trade_offer_id,
+                  'serverid': '1',
+                  'partner': partner_steam_id,
+                  'captcha': ''}
+        headers = {'Referer': COMMUNITY_URL + '/tradeoffer/' + trade_offer_id}
+        response = await self.steam_session.post(accept_url, data=params, headers=headers)
+
+        handle_steam_response(response)
+        response_json = extract_json(response)
+
+        if response_json.get('needs_mobile_confirmation', False):
+            return await self._confirm_trade_offer(trade_offer_id)
+        return response_json
+
+    async def decline_trade_offer(self, trade_offer_id: str) -> dict:
+        params = {'tradeofferid': trade_offer_id}
+        return await self.steam_session.api_call('POST', 'IEconService', 'DeclineTradeOffer', 'v1', params)
+
+    async def cancel_trade_offer(self, trade_offer_id: str) -> dict:
+        params = {'tradeofferid': trade_offer_id}
+        return await self.steam_session.api_call('POST', 'IEconService', 'CancelTradeOffer', 'v1', params)
+
+    async def get_trade_offers(self,
+                               get_sent_offers=True,
+                               get_received_offers=True,
+                               get_descriptions=True,
+                               active_only=True,
+                               historical_only=False,
+                               time_historical_cutoff="",
+                               language="english") -> dict:
+        params = {'get_sent_offers': 1 if get_sent_offers else 0,
+                  "get_received_offers": 1 if get_received_offers else 0,
+                  "get_descriptions": 1 if get_descriptions else 0,
+                  "language": language,
+                  'active_only': 1 if active_only else 0,
+                  'historical_only': 1 if historical_only else 0,
+                  'time_historical_cutoff': time_historical_cutoff}
+        return await self.steam_session.api_call('GET', 'IEconService', 'GetTradeOffers', 'v1', params)
+
+    async def get_trade_offer(self, trade_offer_id: str) -> dict:
+        params = {'tradeofferid': trade_offer_id, 'language': 'english'}
+        return await self.steam_session.api_call('GET', 'IEconService', 'GetTradeOffer', 'v1', params)
+
+    async def get_trade_offers_summary(self) -> dict:
+        return await self.steam_session.api_call('GET', 'IEconService', 'GetTradeOffersSummary', 'v1')
+
+    async def get_trade_history(self,
+                                max_trades=100,
+                                start_after_time=None,
+                                start_after_tradeid=None,
+                                get_descriptions=True,
+                                navigating_back=True,
+                                include_failed=True,
+                                include_total=True) -> dict:
+        params = {
+            'max_trades': max_trades,
+            'start_after_time': start_after_time,
+            'start_after_tradeid': start_after_tradeid,
+            'get_descriptions': get_descriptions,
+            'navigating_back': navigating_back,
+            'include_failed': include_failed,
+            'include_total': include_total
+        }
+        return await self.steam_session.api_call('GET', 'IEconService', 'GetTradeHistory', 'v1', params)
+
+    async def get_trade_receipt(self, trade_id: str) -> list:
+        url = COMMUNITY_URL + "/trade/" + trade_id + "/receipt"
+        html = (await self.steam_session.get(url)).text
+        items = []
+        for item in texts_between(html, "oItem = ", ";\r\n\toItem"):
+            items.append(json.loads(item))
+        return items
+
+    async def get_trade_hold_durations(self, player_steam_id, trade_offer_access_token: str = None) -> dict:
+        params = {"steamid_target": player_steam_id, "trade_offer_access_token": trade_offer_access_token}
+        return await self.steam_session.api_call("GET", "IEconService", "GetTradeHoldDurations", "v1", params)
+
+    async def _get_trade_hold_duration(self, partner_steam_id: str, token: str = None) -> int:
+        """ See SteamClient._get_trade_hold_duration """
+
+        async def fetch() -> dict:
+            return (await self.get_trade_hold_durations(partner_steam_id, token))["response"]["both_escrow"]
+
+        if self.escrow_cache is None:
+            return EscrowCache.get_duration(await fetch())
+        key = self.escrow_cache.create_key(account_id_to_steam_id(partner_steam_id), token)
+        return EscrowCache.get_duration(await self.escrow_cache.get_or_fetch_async(key, fetch))
+
+    def _is_known_without_trade_hold(self, partner_steam_id: str) -> bool:
+        if self.escrow_cache is None:
+            return False
+        return self.escrow_cache.is_offer_partner_without_hold(account_id_to_steam_id(partner_steam_id))
+
+    def _cache_trade_hold(self, partner_steam_id: str, escrow_end_date: int) -> None:
+        """ Record the hold of an offer fetched from Steam, a hold invalidates the cached partner """
+        if self.escrow_cache is not None:
+            self.escrow_cache.set_offer_hold(account_id_to_steam_id(partner_steam_id), escrow_end_date)
+
+    def _get_session_id(self) -> str:
+        return self.steam_session.get_cookie('sessionid')
+
+    async def _confirm_trade_offer(self, trade_offer_id: str) -> dict:
+        conf_executor = AsyncConfirmationExecutor(self.steam_session.steam_guard['identity_secret'],
+                                                  self.steam_session.steam_id,
+                                                  self.steam_session,
+                                                  self.steam_session.confirmation_cache,
+                                                  self.steam_session.guard_keyring)
+        try:
+            return await conf_executor.confirm_trade_offer(trade_offer_id)
+        except Exception as e:
+            raise SteamServerError("[CONFIRM_TRADE_OFFER_ERROR]") from e
@@ -0,0 +1,109 @@
+import asyncio
+from typing import List, Iterable
+
+from .cache import LRUCache
+from .confirmation import Confirmation, ConfirmationExecutor, Tag
+from .exceptions import ConfirmationExpected
+from .guard import GuardKeyring
+from .async_session import AsyncSteamSession, AsyncResponse
+
+
+class AsyncConfirmationExecutor:
+    CONF_URL = ConfirmationExecutor.CONF_URL
+
+    def __init__(self, identity_secret: str, my_steam_id: str, session: AsyncSteamSession,
+                 cache: LRUCache = None, keyring: GuardKeyring = None) -> None:
+        self._my_steam_id = my_steam_id
+        self._identity_secret = identity_secret
+        self._session = session
+        self._cache = cache if cache is not None else LRUCache()
+        self._keyring = keyring if keyring is not None else GuardKeyring(identity_secret=identity_secret,
+                                                                         steam_id=my_steam_id)
+
+    _create_confirmation_params = ConfirmationExecutor._create_confirmation_params
+
+    async def confirm_trade_offer(self, trade_offer_id: str) -> dict:
+        confirmations = await self._get_confirmations()
+        confirmation = await self._select_trade_offer_confirmation(confirmations, trade_offer_id)
+        return await self._send_confirmation(confirmation)
+
+    async def confirm_sell_listing(self, asset_id: str) -> dict:
+        confirmations = await self._get_confirmations()
+        confirmation = await self._select_sell_listing_confirmation(confirmations, asset_id)
+        return await self._send_confirmation(confirmation)
+
+    async def confirm_many(self, trade_offer_ids: Iterable[str] = (), asset_ids: Iterable[str] = (),
+                           max_concurrency: int = 8) -> dict:
+        """ See ConfirmationExecutor.confirm_many """
+        results = ConfirmationExecutor._create_confirm_many_results(trade_offer_ids, asset_ids)
+        if not results['trade_offers'] and not results['sell_listings']:
+            return results
+        confirmations = await self._get_confirmations()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def get_details(confirmation: Confirmation) -> tuple:
+            async with semaphore:
+                return await self._get_confirmation_details(confirmation)
+
+        object_ids = await asyncio.gather(*[get_details(confirmation) for confirmation in confirmations])
+        matches = ConfirmationExecutor._match_confirmations(confirmations, object_ids, results)
+        if matches:
+            response = await self._send_multi_confirmation([confirmation for confirmation, _, _ in matches])
+            ConfirmationExecutor._fill_confirm_many_results(results, matches, response)
+        return results
+
+    async def _send_confirmation(self, confirmation: Confirmation) -> dict:
+        params = self._create_confirmation_params(Tag.ALLOW)
+        params['op'] = Tag.ALLOW
+        params['cid'] = confirmation.data_confid
+        params['ck'] = confirmation.data_key
+        headers = {'X-Requested-With': 'XMLHttpRequest'}
+        response = await self._session.get(self.CONF_URL + '/ajaxop', params=params, headers=headers)
+        return response.json()
+
+    async def _send_multi_confirmation(self, confirmations: List[Confirmation]) -> dict:
+        params = self._create_confirmation_params(Tag.ALLOW)
+        params['op'] = Tag.ALLOW
+        params['cid[]'] = [confirmation.data_confid for confirmation in confirmations]
+        params['ck[]'] = [confirmation.data_key for confirmation in confirmations]
+        headers = {'X-Requested-With': 'XMLHttpRequest'}
+        response = await self._session.post(self.CONF_URL + '/multiajaxop', data=params, headers=headers)
+        return response.json()
+
+    async def _get_confirmations(self) -> List[Confirmation]:
+        confirmations_page = await self._fetch_confirmations_page()
+        return ConfirmationExecutor._get_confirmations_from_html(confirmations_page.text)
+
+    async def _fetch_confirmations_page(self) -> AsyncResponse:
+        params = self._create_confirmation_params(Tag.CONF)
+        headers = {'X-Requested-With': 'com.valvesoftware.android.steam.community'}
+        response = await self._session.get(self.CONF_URL + '/conf', params=params, headers=headers)
+        ConfirmationExecutor._check_confirmations_page(response.text)
+        return response
+
+    async def _get_confirmation_details(self, confirmation: Confirmation) -> tuple:
+        object_id = ConfirmationExecutor._get_cached_confirmation_details(self._cache, confirmation)
+        if object_id is None:
+            details_page = await self._fetch_confirmation_details_page(confirmation)
+            object_id = ConfirmationExecutor._cache_confirmation_details(self._cache, confirmation, details_page)
+        return object_id
+
+    async def _fetch_confirmation_details_page(self, confirmation: Confirmation) -> str:
+        tag = 'details' + confirmation.id
+        params = self._create_confirmation_params(tag)
+        response = await self._session.get(self.CONF_URL + '/details/' + confirmation.id, params=params)
+        return response.json()['html']
+
+    async def _select_trade_offer_confirmation(self, confirmations: List[Confirmation],
+                                               trade_offer_id: str) -> Confirmation:
+        for confirmation in confirmations:
+            if await self._get_confirmation_details(confirmation) == ('trade_offers', trade_offer_id):
+                return confirmation
+        raise ConfirmationExpected
+
+    async def _select_sell_listing_confirmation(self, confirmations: List[Confirmation],
+                                                asset_id: str) -> Confirmation:
+        for confirmation in confirmations:
+            if await self._get_confirmation_details(confirmation) == ('sell_listings', asset_id):
+                return confirmation
+        raise ConfirmationExpected
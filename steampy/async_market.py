@@ -0,0 +1,145 @@
+from .async_confirmation import AsyncConfirmationExecutor
+from .cache import PriceCache
+from .async_session import AsyncSteamSession
+from .exceptions import SteamServerError, ApiException
+from .utils import handle_steam_response, extract_json
+from .constants import COMMUNITY_URL
+from .market import SteamMarket
+from .models import GameOptions, Currency, DescriptionRegistry
+from .parsers import MarketHistoryParser, get_default_market_history_parser
+from .session import login_required
+
+
+class AsyncSteamMarket:
+    """ asyncio counterpart of SteamMarket, the html and json extractors are shared with it """
+
+    def __init__(self, steam_session: AsyncSteamSession, description_registry: DescriptionRegistry = None,
+                 market_history_parser: MarketHistoryParser = None, price_cache: PriceCache = None):
+        self.steam_session = steam_session
+        self.description_registry = description_registry
+        self.market_history_parser = market_history_parser or get_default_market_history_parser()
+        self.price_cache = price_cache
+
+    async def fetch_price(self, market_hash_name: str, game: GameOptions, currency: str = Currency.USD) -> dict:
+        if self.price_cache is None:
+            return await self._fetch_price(market_hash_name, game, currency)
+        key = self.price_cache.create_key(game.app_id, market_hash_name, currency)
+        return await self.price_cache.get_or_fetch_async(
+            key, lambda: self._fetch_price(market_hash_name, game, currency))
+
+    async def _fetch_price(self, market_hash_name: str, game: GameOptions, currency: str = Currency.USD) -> dict:
+        url = COMMUNITY_URL + '/market/priceoverview/'
+        params = {'currency': currency, 'appid': game.app_id, 'market_hash_name': market_hash_name}
+        response = await self.steam_session.get(url, params=params)
+        handle_steam_response(response)
+        response_json = extract_json(response)
+        return response_json
+
+    @login_required
+    async def get_my_market_listings(self, fetch_all_sell_listings=True) -> dict:
+        url = COMMUNITY_URL + "/market"
+        response = await self.steam_session.get(url, cookies={"ActListPageSize": "50"})
+        handle_steam_response(response)
+
+        try:
+            listings = SteamMarket._get_listings_from_html(response.text, self.description_registry)
+            sell_listing_count = len(
+                [a for a in listings.get("sell_listings", {}).values() if not a["need_confirmation"]])
+            if fetch_all_sell_listings and SteamMarket._need_to_fetch_more_sell_listings(response.text):
+                more_sell_listings = await self._get_sell_listings_from_endpoint(sell_listing_count)
+                listings["sell_listings"].update(more_sell_listings["sell_listings"])
+
+        except Exception as e:
+            raise SteamServerError() from e
+
+        return listings
+
+    @login_required
+    async def get_market_history(self, count=30, start=0) -> dict:
+        url = COMMUNITY_URL + "/market/myhistory/render/?query=&start=%s&count=%s" % (start, count)
+        response = await self.steam_session.get(url)
+        handle_steam_response(response)
+        response_json = extract_json(response)
+        return SteamMarket._parse_market_history_response(response_json, self.market_history_parser)
+
+    @login_required
+    async def create_sell_order(self, asset_id: str, game: GameOptions, money_to_receive: str) -> dict:
+        data = {
+            "assetid": asset_id,
+            "sessionid": self._get_session_id(),
+            "contextid": game.context_id,
+            "appid": game.app_id,
+            "amount": 1,
+            "price": money_to_receive
+        }
+        headers = {'Referer': "%s/profiles/%s/inventory" % (COMMUNITY_URL, self.steam_session.steam_id)}
+        response = await self.steam_session.post(COMMUNITY_URL + "/market/sellitem/", data, headers=headers)
+        handle_steam_response(response)
+        response_json = extract_json(response)
+        if response_json.get("needs_mobile_confirmation"):
+            return await self._confirm_sell_listing(asset_id)
+        return response_json
+
+    @login_required
+    async def create_buy_order(self, market_name: str, price_single_item: int, quantity: int, game: GameOptions,
+                               currency: Currency = Currency.USD) -> dict:
+        data = {
+            "sessionid": self._get_session_id(),
+            "currency": currency.value,
+            "appid": game.app_id,
+            "market_hash_name": market_name,
+            "price_total": price_single_item * quantity,
+            "quantity": quantity
+        }
+        headers = {'Referer': "%s/market/listings/%s/%s" % (COMMUNITY_URL, game.app_id, market_name)}
+        response = await self.steam_session.post(COMMUNITY_URL + "/market/createbuyorder/", data, headers=headers)
+        handle_steam_response(response)
+        response_json = extract_json(response)
+
+        if response_json.get("success") != 1:
+            raise ApiException("There was a problem creating the order. Are you using the right currency? success: %s"
+                               % response_json.get("success"))
+        return response_json
+
+    @login_required
+    async def cancel_sell_order(self, sell_listing_id: str):
+        """Steam return nothing from this call"""
+        data = {"sessionid": self._get_session_id()}
+        headers = {'Referer': COMMUNITY_URL + "/market/"}
+        url = "%s/market/removelisting/%s" % (COMMUNITY_URL, sell_listing_id)
+        response = await self.steam_session.post(url, data=data, headers=headers)
+        handle_steam_response(response)
+
+    @login_required
+    async def cancel_buy_order(self, buy_order_id) -> dict:
+        data = {"sessionid": self._get_session_id(), "buy_orderid": buy_order_id}
+        headers = {"Referer": COMMUNITY_URL + "/market"}
+        response = await self.steam_session.post(COMMUNITY_URL + "/market/cancelbuyorder/", data, headers=headers)
+        handle_steam_response(response)
+        response_json = extract_json(response)
+
+        if response_json.get("success") != 1:
+            raise ApiException("There was a problem canceling the order. success: %s" % response_json.get("success"))
+        return response_json
+
+    async def _confirm_sell_listing(self, asset_id: str) -> dict:
+        con_executor = AsyncConfirmationExecutor(self.steam_session.steam_guard['identity_secret'],
+                                                 self.steam_session.steam_guard['steamid'],
+                                                 self.steam_session,
+                                                 self.steam_session.confirmation_cache,
+                                                 self.steam_session.guard_keyring)
+        try:
+            return await con_executor.confirm_sell_listing(asset_id)
+        except Exception as e:
+            raise SteamServerError("[CONFIRM_SELL_LISTING_ERROR]") from e
+
+    def _get_session_id(self) -> str:
+        return self.steam_session.get_cookie('sessionid')
+
+    async def _get_sell_listings_from_endpoint(self, start: int) -> dict:
+        params = {"query": "", "start": start, "count": -1}
+        url = COMMUNITY_URL + "/market/mylistings/render/"
+        response = await self.steam_session.get(url, params=params)
+        handle_steam_response(response)
+        response_json = extract_json(response)
+        return SteamMarket._get_sell_listings_from_endpoint_json(response_json, self.description_registry)
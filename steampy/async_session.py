@@ -0,0 +1,192 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlencode
+
+import aiohttp
+from yarl import URL
+
+from .cache import LRUCache
+from .constants import API_URL
+from .metrics import get_instrumentation, get_endpoint
+from .rate_limit import AdaptiveRateLimiter
+from .session import SteamSession
+from .utils import handle_steam_response, extract_json
+from .exceptions import SteamServerError, InvalidCredentials, LoginRequired
+
+
+class AsyncResponse:
+    """ The subset of requests.Response used by the helpers in utils.py """
+
+    def __init__(self, status_code: int, url: str, headers: dict, content: bytes, encoding: str = None) -> None:
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding or 'utf-8'
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors='replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncSteamSession:
+    """
+    asyncio counterpart of SteamSession built on aiohttp.
+    Login is delegated to a SteamSession running in the default executor, the resulting cookies are then imported.
+    """
+
+    def __init__(self, connection_limit: int = 100, timeout: float = 30,
+                 rate_limiter: AdaptiveRateLimiter = None) -> None:
+        self._connection_limit = connection_limit
+        self._timeout = timeout
+        self._session = None  # type: aiohttp.ClientSession
+        self._sync_session = None  # type: SteamSession
+        self._login_executor = None
+
+        self.steam_guard = {}
+        self.guard_keyring = None
+        self.steam_id = None  # type: str
+        self.api_key = None  # type: str
+        self.confirmation_cache = LRUCache()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else AdaptiveRateLimiter()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._connection_limit)
+            timeout = aiohttp.ClientTimeout(total=self._timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def login(self, username: str, password: str, steam_guard: str) -> None:
+        sync_session = SteamSession()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, sync_session.login, username, password, steam_guard)
+        self.import_session(sync_session)
+
+    async def relogin(self) -> None:
+        if self._sync_session is None:
+            raise LoginRequired('Use login method first')
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._sync_session.relogin)
+        self.import_session(self._sync_session)
+
+    def import_session(self, steam_session: SteamSession) -> None:
+        """ Take over the cookies and the account data of an already logged in SteamSession """
+        for cookie in steam_session.cookies:
+            url = URL('https://' + cookie.domain.lstrip('.') + (cookie.path or '/'))
+            self.session.cookie_jar.update_cookies({cookie.name: cookie.value}, url)
+        self._sync_session = steam_session
+        self._login_executor = steam_session._login_executor
+        self.steam_guard = steam_session.steam_guard
+        self.guard_keyring = steam_session.guard_keyring
+        self.steam_id = steam_session.steam_id
+        if steam_session.api_key and not self.api_key:
+            self.api_key = steam_session.api_key
+
+    def get_cookie(self, name: str, domain: str = None) -> str:
+        for cookie in self.session.cookie_jar:
+            if cookie.key == name and (domain is None or cookie['domain'].lstrip('.') == domain):
+                return cookie.value
+        raise KeyError(name)
+
+    async def api_call(self, request_method: str, interface: str, api_method: str, version: str,
+                       params: dict = None) -> dict:
+        url = "/".join([API_URL, interface, api_method, version])
+        params = params or {}
+        if self.api_key:
+            params["key"] = self.api_key
+
+        if request_method == 'GET':
+            response = await self.get(url, params=params)
+        else:
+            response = await self.post(url, data=params)
+
+        if "Please verify your <pre>key=</pre> parameter" in response.text:
+            raise InvalidCredentials("Invalid Steam API key")
+
+        handle_steam_response(response)
+        response_json = extract_json(response)
+        return response_json
+
+    async def request(self, method: str, url: str, params: dict = None, data: dict = None,
+                      **kwargs) -> AsyncResponse:
+        if params is not None:
+            params = self._encode_fields(params)
+        if data is not None and not isinstance(data, (str, bytes)):
+            data = self._encode_fields(data)
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve(url)
+                if delay:
+                    await asyncio.sleep(delay)
+            response = await self._send(method, url, params=params, data=data, **kwargs)
+            if self.rate_limiter is None:
+                return response
+            self.rate_limiter.on_response(url, response.status_code)
+            if response.status_code != 429 or attempt >= self.rate_limiter.max_retries:
+                return response
+            await asyncio.sleep(self.rate_limiter.backoff(attempt, response.headers.get('Retry-After')))
+            attempt += 1
+
+    async def _send(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        instrumentation = get_instrumentation()
+        start = time.perf_counter()
+        try:
+            async with self.session.request(method, url, **kwargs) as response:
+                content = await response.read()
+                response = AsyncResponse(response.status, str(response.url), dict(response.headers), content,
+                                         response.get_encoding() if content else None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if instrumentation.enabled:
+                instrumentation.on_error(method, get_endpoint(url), time.perf_counter() - start, e)
+            raise SteamServerError() from e
+        if instrumentation.enabled:
+            instrumentation.on_response(method, get_endpoint(url), response.status_code, time.perf_counter() - start,
+                                        self._get_body_size(kwargs.get('data')), len(response.content))
+        return response
+
+    @staticmethod
+    def _get_body_size(data) -> int:
+        if data is None:
+            return 0
+        if isinstance(data, (str, bytes)):
+            return len(data)
+        return len(urlencode(data, doseq=True))
+
+    async def get(self, url: str, **kwargs) -> AsyncResponse:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, data: dict = None, **kwargs) -> AsyncResponse:
+        return await self.request('POST', url, data=data, **kwargs)
+
+    async def head(self, url: str, **kwargs) -> AsyncResponse:
+        kwargs.setdefault('allow_redirects', False)
+        return await self.request('HEAD', url, **kwargs)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @staticmethod
+    def _encode_fields(fields: dict) -> list:
+        """ Mimic requests: skip None values and expand lists and tuples into repeated fields """
+        encoded = []
+        for key, value in fields.items():
+            values = value if isinstance(value, (list, tuple)) else [value]
+            for v in values:
+                if v is None:
+                    continue
+                encoded.append((key, str(v)))
+        return encoded
@@ -0,0 +1,305 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class SqliteCache:
+    """
+    On-disk key-value store. Values must be json serializable.
+    It can be shared by several processes. When 'maxsize' is set the least recently written entries are evicted.
+    """
+
+    def __init__(self, path: str, maxsize: int = None) -> None:
+        self.path = path
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS cache '
+                                 '(key TEXT PRIMARY KEY, value TEXT NOT NULL, written REAL NOT NULL, expires REAL)')
+
+    def get(self, key: str, default=None):
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else default
+
+    def get_entry(self, key: str):
+        """ Return (value, expiration timestamp or None) or None if missing or expired """
+        with self._lock:
+            row = self._connection.execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value, ttl: float = None) -> None:
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+        with self._lock:
+            self._connection.execute('INSERT OR REPLACE INTO cache (key, value, written, expires) VALUES (?, ?, ?, ?)',
+                                     (key, json.dumps(value), now, expires))
+            if self.maxsize is not None:
+                self._connection.execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                                         'ORDER BY written DESC LIMIT -1 OFFSET ?)', (self.maxsize,))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute('DELETE FROM cache')
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __getstate__(self):
+        return {'path': self.path, 'maxsize': self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['maxsize'])
+
+    def __contains__(self, key: str) -> bool:
+        return self.get_entry(key) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+class LRUCache:
+    """
+    Thread safe in-memory LRU cache holding at most 'maxsize' entries, each living at most 'ttl' seconds if set.
+    An optional 'backend' (e.g. SqliteCache) is written through and consulted on memory misses.
+    """
+
+    def __init__(self, maxsize: int = 1024, backend: SqliteCache = None, ttl: float = None) -> None:
+        self.maxsize = maxsize
+        self.backend = backend
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.time():
+                    self._data.move_to_end(key)
+                    return value
+                del self._data[key]
+        if self.backend is None:
+            return default
+        entry = self.backend.get_entry(key)
+        if entry is None:
+            return default
+        self._store(key, *entry)
+        return entry[0]
+
+    def set(self, key: str, value, ttl: float = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl
+        self._store(key, value, time.time() + ttl if ttl is not None else None)
+        if self.backend is not None:
+            self.backend.set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def _store(self, key: str, value, expires: float = None) -> None:
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight:
+    """ Concurrent calls with the same key share the result of the first one instead of running again """
+
+    class _Call:
+        def __init__(self) -> None:
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self) -> None:
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, function):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class FetchCache:
+    """
+    Cache of fetched json values: entries live 'ttl' seconds and concurrent misses on one key result in a single
+    fetch. Pass a SqliteCache 'backend' to share the entries between processes.
+    """
+
+    def __init__(self, ttl: float = 60, maxsize: int = 10000, backend: SqliteCache = None) -> None:
+        self._cache = LRUCache(maxsize, backend, ttl)
+        self._single_flight = SingleFlight()
+        self._async_calls = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> dict:
+        """ Return the cached value or None, counted as a hit or a miss """
+        value = self._cache.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return dict(value)
+
+    def get_or_fetch(self, key: str, fetch) -> dict:
+        """ Return the cached value or call 'fetch()' once for all the concurrent callers """
+        value = self.get(key)
+        if value is not None:
+            return value
+        return dict(self._single_flight.do(key, lambda: self._fetch_and_store(key, fetch)))
+
+    async def get_or_fetch_async(self, key: str, fetch) -> dict:
+        """ Same as 'get_or_fetch' but 'fetch()' returns an awaitable """
+        value = self.get(key)
+        if value is not None:
+            return value
+        future = self._async_calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch_and_store_async(key, fetch))
+            self._async_calls[key] = future
+            future.add_done_callback(lambda _: self._async_calls.pop(key, None))
+        return dict(await asyncio.shield(future))
+
+    def set(self, key: str, value: dict) -> None:
+        self._cache.set(key, value)
+
+    def invalidate(self, key: str) -> None:
+        self._cache.delete(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def _fetch_and_store(self, key: str, fetch) -> dict:
+        # a leader that finished between our miss and this flight already stored the value
+        value = self._cache.get(key)
+        if value is not None:
+            return value
+        value = fetch()
+        self.set(key, value)
+        return value
+
+    async def _fetch_and_store_async(self, key: str, fetch) -> dict:
+        value = await fetch()
+        self.set(key, value)
+        return value
+
+
+class PriceCache(FetchCache):
+    """
+    Cache of SteamMarket.fetch_price responses keyed on (app id, currency, market hash name).
+    Entries live 'ttl' seconds. Concurrent misses on one key result in a single request.
+    Pass a SqliteCache 'backend' to share prices between processes.
+    """
+
+    @staticmethod
+    def create_key(app_id: str, market_hash_name: str, currency) -> str:
+        return '%s:%s:%s' % (app_id, int(currency), market_hash_name)
+
+
+class EscrowCache(FetchCache):
+    """
+    Cache of trade holds for SteamClient.send_trade_offer and accept_trade_offer, only partners without hold are kept,
+    for 'ttl' seconds, and a hold reported by Steam invalidates the entry. It holds two separate sources:
+    - 'both_escrow' of GetTradeHoldDurations keyed on (partner steam id, trade offer token), used by the sends;
+      'hits' and 'misses' count these lookups, i.e. the GetTradeHoldDurations requests saved and made.
+    - the 'escrow_end_date' of the offers received from a partner, used by the accepts;
+      'offer_hits' and 'offer_misses' count these lookups.
+    """
+
+    def __init__(self, ttl: float = 3600, maxsize: int = 10000, backend: SqliteCache = None) -> None:
+        super().__init__(ttl, maxsize, backend)
+        self.offer_hits = 0
+        self.offer_misses = 0
+
+    @staticmethod
+    def create_key(partner_steam_id: str, token: str = None) -> str:
+        return 'escrow:%s:%s' % (partner_steam_id, token or '')
+
+    @staticmethod
+    def create_offer_key(partner_steam_id: str) -> str:
+        return 'offer:%s' % partner_steam_id
+
+    @staticmethod
+    def get_duration(escrow: dict) -> int:
+        return int(escrow['escrow_end_duration_seconds'])
+
+    def set(self, key: str, value: dict) -> None:
+        if self.get_duration(value) != 0:
+            self.invalidate(key)
+        else:
+            super().set(key, value)
+
+    def is_offer_partner_without_hold(self, partner_steam_id: str) -> bool:
+        """ True if a recent offer of that partner had no hold """
+        known = self._cache.get(self.create_offer_key(partner_steam_id)) is not None
+        with self._lock:
+            if known:
+                self.offer_hits += 1
+            else:
+                self.offer_misses += 1
+        return known
+
+    def set_offer_hold(self, partner_steam_id: str, escrow_end_date: int) -> None:
+        """ Record the 'escrow_end_date' of an offer received from that partner """
+        key = self.create_offer_key(partner_steam_id)
+        if escrow_end_date != 0:
+            self.invalidate(key)
+        else:
+            self._cache.set(key, {'escrow_end_date': 0})
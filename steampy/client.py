@@ -1,25 +1,32 @@
 import json
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterable, Iterator, Tuple
 
 import pickle
 
 import os.path
 
+from .cache import EscrowCache
 from .market import SteamMarket
 from .session import SteamSession, login_required
 from .confirmation import ConfirmationExecutor
-from .exceptions import SteamServerError, ParameterError, TradeHoldException
+from .exceptions import SteamServerError, ParameterError, TradeHoldException, LoginRequired
 from .constants import COMMUNITY_URL, STORE_URL
 from .utils import get_partner_from_trade_offer_url, get_token_from_trade_offer_url, account_id_to_steam_id, \
-    steam_id_to_account_id, texts_between, handle_steam_response, extract_json
-from .models import GameOptions, Asset
+    steam_id_to_account_id, texts_between, handle_steam_response, extract_json, get_description_key, merge_item
+from .models import GameOptions, Asset, TradeOfferState
 
 
 class SteamClient:
-    def __init__(self, api_key: str = None) -> None:
+    def __init__(self, api_key: str = None, escrow_cache: EscrowCache = None) -> None:
+        """
+        With an 'escrow_cache' send_trade_offer and accept_trade_offer skip the trade hold request for partners
+        already checked without hold.
+        """
         super().__init__()
         self.steam_session = SteamSession()
         self.market = SteamMarket(self.steam_session)
+        self.escrow_cache = escrow_cache
 
         if api_key:
             self.api_key = api_key
@@ -38,13 +45,51 @@ class SteamClient:
     def relogin(self):
         self.steam_session.relogin()
 
+    def save_session(self, path: str) -> None:
+        """
+        Save the cookies, the steam id and the Steam Guard data (secrets included) of the logged in session to 'path'
+        as json. The file gives access to the account: it is written readable by its owner only, keep it private.
+        """
+        temporary_path = path + '.tmp'
+        descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'w') as f:
+            json.dump(self.steam_session.export_state(), f)
+        os.replace(temporary_path, path)
+
+    def load_session(self, path: str, username: str = None, password: str = None, steam_guard: str = None) -> bool:
+        """
+        Resume a session saved by 'save_session', one cheap request checks that it is still alive before the client
+        takes it over. When the file is missing or the session is dead, login with 'username', 'password' and
+        'steam_guard' and save the new session to 'path'. Return True if the saved session was reused.
+        Without 'password' a reused session can not 'relogin'.
+        """
+        if os.path.isfile(path):
+            with open(path) as f:
+                state = json.load(f)
+            candidate = SteamSession(rate_limiter=self.steam_session.rate_limiter)
+            candidate.adapters = self.steam_session.adapters
+            candidate.import_state(state)
+            if self._is_session_alive(candidate):
+                self.steam_session.import_state(state, password)
+                return True
+        if username is None or password is None or steam_guard is None:
+            raise LoginRequired("Saved session is missing or expired, 'username', 'password' and 'steam_guard' "
+                                "are needed to login again")
+        self.login(username, password, steam_guard)
+        self.save_session(path)
+        return False
+
     def logout(self) -> None:
         raise NotImplementedError
 
     def is_session_alive(self) -> bool:
         """ Check if you are still logged in on Steam """
+        return self._is_session_alive(self.steam_session)
+
+    @staticmethod
+    def _is_session_alive(steam_session: SteamSession) -> bool:
         url = STORE_URL + "/account/store_transactions/"
-        head_response = self.steam_session.head(url)
+        head_response = steam_session.head(url)
         return head_response.status_code == 200
 
     def get_player_inventory(self, player_steam_id: str, game: GameOptions, count=0) -> dict:
@@ -67,6 +112,35 @@ class SteamClient:
         """
         return self.get_player_inventory(self.steam_session.steam_id, game, count)
 
+    def iter_inventory(self, player_steam_id: str, game: GameOptions, page_size: int = 2000) -> Iterator[dict]:
+        """
+        Yield every item of the inventory of the player merged with its description.
+        Pages of 'page_size' items are fetched one by one following 'start_assetid', so only one page is kept in
+        memory and the inventory is not truncated at 5000 items like in 'get_player_inventory(...)'.
+        """
+        for page in self.iter_inventory_pages(player_steam_id, game, page_size):
+            descriptions = {get_description_key(description): description
+                            for description in page.get('descriptions', [])}
+            for asset in page.get('assets', []):
+                yield merge_item(asset, descriptions)
+
+    @login_required
+    def iter_my_inventory(self, game: GameOptions, page_size: int = 2000) -> Iterator[dict]:
+        return self.iter_inventory(self.steam_session.steam_id, game, page_size)
+
+    def iter_inventory_pages(self, player_steam_id: str, game: GameOptions, page_size: int = 2000) -> Iterator[dict]:
+        """ Yield the raw inventory pages, with their 'assets' and 'descriptions', following 'start_assetid' """
+        url = "%s/inventory/%s/%s/%s" % (COMMUNITY_URL, player_steam_id, game.app_id, game.context_id)
+        params = {'l': 'english', 'count': page_size}
+        while True:
+            response = self.steam_session.get(url, params=params)
+            handle_steam_response(response)
+            page = extract_json(response)
+            yield page
+            if not page.get('more_items'):
+                return
+            params['start_assetid'] = page['last_assetid']
+
     @login_required
     def send_trade_offer(self,
                          items_to_give: List[Asset],
@@ -82,6 +156,44 @@ class SteamClient:
         'message' can be omitted.
         If 'check_trade_hold' is set to True the offer will not be sent if the items will be put on hold after the trade
         """
+        response_json = self._send_trade_offer(items_to_give, items_to_receive, message, partner_steam_id,
+                                               trade_offer_url, check_trade_hold)
+        if response_json.get('needs_mobile_confirmation'):
+            confirmation_response_dict = self._confirm_trade_offer(response_json['tradeofferid'])
+            response_json.update(confirmation_response_dict)
+        return response_json
+
+    @login_required
+    def send_trade_offers(self, batch: Iterable[dict], check_trade_hold=True, max_workers: int = 4) -> List[dict]:
+        """
+        Send several trade offers, then confirm all those needing a mobile confirmation with one confirm_many pass.
+        Every dict of 'batch' holds send_trade_offer arguments: 'items_to_give', 'items_to_receive' and optionally
+        'message', 'partner_steam_id', 'trade_offer_url', 'check_trade_hold'.
+        The offers are sent on 'max_workers' threads, throttled by the 'tradeoffer' family of the session rate limiter.
+        Return a dict per offer, in 'batch' order: Steam's response with 'confirmed' set when a confirmation was
+        needed, or {'error': exception} if the offer was not sent. A failed confirmation pass sets 'confirmed' to False
+        and 'error' on the offers it should have confirmed.
+        """
+        batch = [dict({'check_trade_hold': check_trade_hold}, **offer) for offer in batch]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(self._try_send_trade_offer, batch))
+        self._confirm_trade_offers({result['tradeofferid']: result for result in results if 'tradeofferid' in result})
+        return results
+
+    def _try_send_trade_offer(self, offer: dict) -> dict:
+        try:
+            return self._send_trade_offer(**offer)
+        except Exception as e:
+            return {'error': e}
+
+    def _send_trade_offer(self,
+                          items_to_give: List[Asset],
+                          items_to_receive: List[Asset],
+                          message: str = None,
+                          partner_steam_id: str = None,
+                          trade_offer_url: str = None,
+                          check_trade_hold=True) -> dict:
+        """ send_trade_offer without the confirmation """
         token = None
         trade_offer_create_params = {}
         if trade_offer_url:
@@ -98,11 +210,8 @@ class SteamClient:
         else:
             raise ParameterError("A 'trade_offer_url' or a 'partner_steam_id' is needed to use this method")
 
-        if check_trade_hold:
-            json_response = self.get_trade_hold_durations(partner_steam_id, token)
-            trade_hold_duration = json_response["response"]["both_escrow"]["escrow_end_duration_seconds"]
-            if trade_hold_duration != 0:
-                raise TradeHoldException("Offer not sent because items will be on hold")
+        if check_trade_hold and self._get_trade_hold_duration(partner_steam_id, token) != 0:
+            raise TradeHoldException("Offer not sent because items will be on hold")
 
         offer = self._create_offer_dict(items_to_give, items_to_receive)
         params = {
@@ -120,12 +229,8 @@ class SteamClient:
         handle_steam_response(response)
         response_json = extract_json(response)
 
-        if response_json.get('needs_mobile_confirmation'):
-            if "tradeofferid" not in response_json:
-                raise SteamServerError("Steam responded without a 'tradeofferid'")
-
-            confirmation_response_dict = self._confirm_trade_offer(response_json['tradeofferid'])
-            response_json.update(confirmation_response_dict)
+        if response_json.get('needs_mobile_confirmation') and "tradeofferid" not in response_json:
+            raise SteamServerError("Steam responded without a 'tradeofferid'")
         return response_json
 
     @login_required
@@ -138,15 +243,64 @@ class SteamClient:
         This is useful when you fetch a trade offer from 'get_trade_offers(...)' or 'get_trade_offer(...)' so you
         already have all the required information.
         """
+        if check_trade_hold and partner_steam_id and self._is_known_without_trade_hold(partner_steam_id):
+            check_trade_hold = False
+
         if check_trade_hold or not partner_steam_id:
             offer = self.get_trade_offer(trade_offer_id)["response"]["offer"]
 
-            if check_trade_hold and offer["escrow_end_date"] != 0:
-                raise TradeHoldException("Offer not accepted because items will be put on hold")
-
             if not partner_steam_id:
                 partner_steam_id = offer["accountid_other"]
 
+            if check_trade_hold:
+                self._cache_trade_hold(partner_steam_id, offer["escrow_end_date"])
+                if offer["escrow_end_date"] != 0:
+                    raise TradeHoldException("Offer not accepted because items will be put on hold")
+
+        response_json = self._accept_trade_offer(trade_offer_id, partner_steam_id)
+        if response_json.get('needs_mobile_confirmation', False):
+            return self._confirm_trade_offer(trade_offer_id)
+        return response_json
+
+    @login_required
+    def accept_trade_offers(self, offers, check_trade_hold=True, max_workers: int = 4) -> Dict[str, dict]:
+        """
+        Accept the active received offers of a 'get_trade_offers(...)' response, or the offers of such a response
+        given as a list (e.g. filtered), without fetching them again: partner and trade hold are read from the offers.
+        The offers are accepted on 'max_workers' threads, then the mobile confirmations are done in one confirm_many
+        pass.
+        Return {trade_offer_id: Steam's response with 'confirmed' set when a confirmation was needed}, or
+        {'error': exception} for the offers not accepted, e.g. a TradeHoldException if 'check_trade_hold' is set.
+        """
+        if isinstance(offers, dict):
+            offers = [offer for offer in offers['response'].get('trade_offers_received', [])
+                      if offer['trade_offer_state'] == TradeOfferState.Active]
+        results = {}
+        to_accept = []
+        for offer in offers:
+            trade_offer_id = offer['tradeofferid']
+            if check_trade_hold:
+                self._cache_trade_hold(offer['accountid_other'], offer['escrow_end_date'])
+                if offer['escrow_end_date'] != 0:
+                    results[trade_offer_id] = {
+                        'error': TradeHoldException("Offer not accepted because items will be put on hold")}
+                    continue
+            to_accept.append((trade_offer_id, offer['accountid_other']))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            responses = pool.map(lambda args: self._try_accept_trade_offer(*args), to_accept)
+            for (trade_offer_id, _), response_json in zip(to_accept, responses):
+                results[trade_offer_id] = response_json
+        self._confirm_trade_offers(results)
+        return results
+
+    def _try_accept_trade_offer(self, trade_offer_id: str, partner_steam_id: str) -> dict:
+        try:
+            return self._accept_trade_offer(trade_offer_id, partner_steam_id)
+        except Exception as e:
+            return {'error': e}
+
+    def _accept_trade_offer(self, trade_offer_id: str, partner_steam_id: str) -> dict:
+        """ accept_trade_offer without the checks and the confirmation """
         partner_steam_id = account_id_to_steam_id(partner_steam_id)
         accept_url = COMMUNITY_URL + '/tradeoffer/' + trade_offer_id + '/accept'
         params = {'sessionid': self._get_session_id(),
@@ -159,11 +313,7 @@ class SteamClient:
         response = self.steam_session.post(accept_url, data=params, headers=headers)
 
         handle_steam_response(response)
-        response_json = extract_json(response)
-
-        if response_json.get('needs_mobile_confirmation', False):
-            return self._confirm_trade_offer(trade_offer_id)
-        return response_json
+        return extract_json(response)
 
     def decline_trade_offer(self, trade_offer_id: str) -> dict:
         params = {'tradeofferid': trade_offer_id}
@@ -189,7 +339,7 @@ class SteamClient:
                   "get_descriptions": 1 if get_descriptions else 0,
                   "language": language,
                   'active_only': 1 if active_only else 0,
-                  'historical_only': 0 if historical_only else 0,
+                  'historical_only': 1 if historical_only else 0,
                   'time_historical_cutoff': time_historical_cutoff}
         response_json = self.steam_session.api_call('GET', 'IEconService', 'GetTradeOffers', 'v1', params)
         return response_json
@@ -223,6 +373,40 @@ class SteamClient:
         response_json = self.steam_session.api_call('GET', 'IEconService', 'GetTradeHistory', 'v1', params)
         return response_json
 
+    def iter_trade_history(self, cursor: dict = None, page_size: int = 100, get_descriptions=True,
+                           include_failed=True) -> Iterator[Tuple[dict, dict]]:
+        """
+        Yield (trade, cursor) for every trade from the newest to the oldest, pages are fetched one at a time.
+        With 'get_descriptions' every asset of 'assets_given' and 'assets_received' is merged into a copy of its
+        description, the asset fields ('assetid', 'new_assetid', 'new_contextid'...) winning over the description ones.
+        'cursor' is a json serializable dict: pass the one of the last processed trade to resume after it.
+        """
+        cursor = dict(cursor or {})
+        while True:
+            response = self.get_trade_history(max_trades=page_size,
+                                              start_after_time=cursor.get('start_after_time'),
+                                              start_after_tradeid=cursor.get('start_after_tradeid'),
+                                              get_descriptions=get_descriptions,
+                                              navigating_back=False,
+                                              include_failed=include_failed,
+                                              include_total=False)['response']
+            trades = response.get('trades', [])
+            descriptions = {get_description_key(description): description
+                            for description in response.get('descriptions', [])}
+            for trade in trades:
+                if get_descriptions:
+                    trade['assets_given'] = self._merge_trade_assets(trade.get('assets_given', []), descriptions)
+                    trade['assets_received'] = self._merge_trade_assets(trade.get('assets_received', []), descriptions)
+                cursor = {'start_after_time': trade['time_init'], 'start_after_tradeid': trade['tradeid']}
+                yield trade, cursor
+            if not trades or not response.get('more'):
+                return
+
+    @staticmethod
+    def _merge_trade_assets(assets: List[dict], descriptions: dict) -> List[dict]:
+        """ Trade history assets keep their own fields, a missing description leaves the asset as it is """
+        return [dict(descriptions.get(get_description_key(asset), {}), **asset) for asset in assets]
+
     def get_trade_receipt(self, trade_id: str) -> list:
         url = COMMUNITY_URL + "/trade/" + trade_id + "/receipt"
         html = self.steam_session.get(url).text
@@ -240,6 +424,27 @@ class SteamClient:
         response_json = self.steam_session.api_call("GET", "IEconService", "GetTradeHoldDurations", "v1", params)
         return response_json
 
+    def _get_trade_hold_duration(self, partner_steam_id: str, token: str = None) -> int:
+        """ Trade hold in seconds of a trade with that partner, from 'escrow_cache' when possible """
+
+        def fetch() -> dict:
+            return self.get_trade_hold_durations(partner_steam_id, token)["response"]["both_escrow"]
+
+        if self.escrow_cache is None:
+            return EscrowCache.get_duration(fetch())
+        key = self.escrow_cache.create_key(account_id_to_steam_id(partner_steam_id), token)
+        return EscrowCache.get_duration(self.escrow_cache.get_or_fetch(key, fetch))
+
+    def _is_known_without_trade_hold(self, partner_steam_id: str) -> bool:
+        if self.escrow_cache is None:
+            return False
+        return self.escrow_cache.is_offer_partner_without_hold(account_id_to_steam_id(partner_steam_id))
+
+    def _cache_trade_hold(self, partner_steam_id: str, escrow_end_date: int) -> None:
+        """ Record the hold of an offer fetched from Steam, a hold invalidates the cached partner """
+        if self.escrow_cache is not None:
+            self.escrow_cache.set_offer_hold(account_id_to_steam_id(partner_steam_id), escrow_end_date)
+
     def _get_session_id(self) -> str:
         return self.steam_session.cookies.get_dict()['sessionid']
 
@@ -260,11 +465,30 @@ class SteamClient:
             }
         }
 
+    def _create_confirmation_executor(self) -> ConfirmationExecutor:
+        return ConfirmationExecutor(self.steam_session.steam_guard['identity_secret'],
+                                    self.steam_session.steam_id,
+                                    self.steam_session,
+                                    self.steam_session.confirmation_cache,
+                                    self.steam_session.guard_keyring)
+
     def _confirm_trade_offer(self, trade_offer_id: str) -> dict:
-        conf_executor = ConfirmationExecutor(self.steam_session.steam_guard['identity_secret'],
-                                             self.steam_session.steam_id,
-                                             self.steam_session)
         try:
-            return conf_executor.confirm_trade_offer(trade_offer_id)
+            return self._create_confirmation_executor().confirm_trade_offer(trade_offer_id)
         except Exception as e:
             raise SteamServerError("[CONFIRM_TRADE_OFFER_ERROR]") from e
+
+    def _confirm_trade_offers(self, responses: Dict[str, dict]) -> None:
+        """ Confirm the trade offers of {trade_offer_id: response} needing it with confirm_many, set 'confirmed' """
+        pending = {trade_offer_id: response for trade_offer_id, response in responses.items()
+                   if response.get('needs_mobile_confirmation') and 'error' not in response}
+        if not pending:
+            return
+        try:
+            confirmed = self._create_confirmation_executor().confirm_many(pending)['trade_offers']
+        except Exception as e:
+            confirmed = {}
+            for response in pending.values():
+                response['error'] = e
+        for trade_offer_id, response in pending.items():
+            response['confirmed'] = confirmed.get(trade_offer_id, False)
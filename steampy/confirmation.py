@@ -1,11 +1,13 @@
 import json
-import time
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Iterable, Tuple
 
 import requests
 from bs4 import BeautifulSoup
 
-from .guard import generate_device_id, generate_confirmation_key
+from .cache import LRUCache
+from .guard import GuardKeyring
+from .metrics import instrumented_parser
 from .exceptions import ConfirmationExpected
 from .login import InvalidCredentials
 
@@ -27,10 +29,18 @@ class Tag:
 class ConfirmationExecutor:
     CONF_URL = "https://steamcommunity.com/mobileconf"
 
-    def __init__(self, identity_secret: str, my_steam_id: str, session: requests.Session) -> None:
+    def __init__(self, identity_secret: str, my_steam_id: str, session: requests.Session,
+                 cache: LRUCache = None, keyring: GuardKeyring = None) -> None:
+        """
+        'cache' maps data_confid to the parsed details page, pass a shared one to reuse it between executors.
+        'keyring' (the session one) provides the decoded identity secret, the device id and the Steam time.
+        """
         self._my_steam_id = my_steam_id
         self._identity_secret = identity_secret
         self._session = session
+        self._cache = cache if cache is not None else LRUCache()
+        self._keyring = keyring if keyring is not None else GuardKeyring(identity_secret=identity_secret,
+                                                                         steam_id=my_steam_id)
 
     def confirm_trade_offer(self, trade_offer_id: str) -> dict:
         confirmations = self._get_confirmations()
@@ -42,18 +52,51 @@ class ConfirmationExecutor:
         confirmation = self._select_sell_listing_confirmation(confirmations, asset_id)
         return self._send_confirmation(confirmation)
 
+    def confirm_many(self, trade_offer_ids: Iterable[str] = (), asset_ids: Iterable[str] = (),
+                     max_workers: int = 8) -> dict:
+        """
+        Confirm several trade offers and sell listings with one confirmation list fetch, concurrent details fetches
+        and a single multi-confirmation request.
+        Return {'trade_offers': {trade_offer_id: bool}, 'sell_listings': {asset_id: bool}}, False meaning
+        that no pending confirmation was found for that id or that Steam refused it.
+        """
+        results = self._create_confirm_many_results(trade_offer_ids, asset_ids)
+        if not results['trade_offers'] and not results['sell_listings']:
+            return results
+        confirmations = self._get_confirmations()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            object_ids = list(pool.map(self._get_confirmation_details, confirmations))
+        matches = self._match_confirmations(confirmations, object_ids, results)
+        if matches:
+            response = self._send_multi_confirmation([confirmation for confirmation, _, _ in matches])
+            self._fill_confirm_many_results(results, matches, response)
+        return results
+
     def _send_confirmation(self, confirmation: Confirmation) -> dict:
         params = self._create_confirmation_params(Tag.ALLOW)
-        params['op'] = Tag.ALLOW,
+        params['op'] = Tag.ALLOW
         params['cid'] = confirmation.data_confid
         params['ck'] = confirmation.data_key
         headers = {'X-Requested-With': 'XMLHttpRequest'}
         return self._session.get(self.CONF_URL + '/ajaxop', params=params, headers=headers).json()
 
+    def _send_multi_confirmation(self, confirmations: List[Confirmation]) -> dict:
+        params = self._create_confirmation_params(Tag.ALLOW)
+        params['op'] = Tag.ALLOW
+        params['cid[]'] = [confirmation.data_confid for confirmation in confirmations]
+        params['ck[]'] = [confirmation.data_key for confirmation in confirmations]
+        headers = {'X-Requested-With': 'XMLHttpRequest'}
+        return self._session.post(self.CONF_URL + '/multiajaxop', data=params, headers=headers).json()
+
     def _get_confirmations(self) -> List[Confirmation]:
-        confirmations = []
         confirmations_page = self._fetch_confirmations_page()
-        soup = BeautifulSoup(confirmations_page.text, 'html.parser')
+        return self._get_confirmations_from_html(confirmations_page.text)
+
+    @staticmethod
+    @instrumented_parser('confirmation.list')
+    def _get_confirmations_from_html(html: str) -> List[Confirmation]:
+        confirmations = []
+        soup = BeautifulSoup(html, 'html.parser')
         if soup.select('#mobileconf_empty'):
             return confirmations
         for confirmation_div in soup.select('#mobileconf_list .mobileconf_list_entry'):
@@ -67,10 +110,35 @@ class ConfirmationExecutor:
         params = self._create_confirmation_params(Tag.CONF)
         headers = {'X-Requested-With': 'com.valvesoftware.android.steam.community'}
         response = self._session.get(self.CONF_URL + '/conf', params=params, headers=headers)
-        if 'Steam Guard Mobile Authenticator is providing incorrect Steam Guard codes.' in response.text:
-            raise InvalidCredentials('Invalid Steam Guard file')
+        self._check_confirmations_page(response.text)
         return response
 
+    @staticmethod
+    def _check_confirmations_page(html: str) -> None:
+        if 'Steam Guard Mobile Authenticator is providing incorrect Steam Guard codes.' in html:
+            raise InvalidCredentials('Invalid Steam Guard file')
+
+    def _get_confirmation_details(self, confirmation: Confirmation) -> Tuple[str, str]:
+        """ Return (kind, id) of the confirmation, the details page is only fetched on cache misses """
+        object_id = self._get_cached_confirmation_details(self._cache, confirmation)
+        if object_id is None:
+            details_page = self._fetch_confirmation_details_page(confirmation)
+            object_id = self._cache_confirmation_details(self._cache, confirmation, details_page)
+        return object_id
+
+    @staticmethod
+    def _get_cached_confirmation_details(cache: LRUCache, confirmation: Confirmation) -> Tuple[str, str]:
+        cached = cache.get(confirmation.data_confid)
+        return tuple(cached) if cached is not None else None
+
+    @classmethod
+    def _cache_confirmation_details(cls, cache: LRUCache, confirmation: Confirmation,
+                                    details_page: str) -> Tuple[str, str]:
+        kind, object_id = cls._get_confirmation_object_id(details_page)
+        if kind is not None:
+            cache.set(confirmation.data_confid, [kind, object_id])
+        return kind, object_id
+
     def _fetch_confirmation_details_page(self, confirmation: Confirmation) -> str:
         tag = 'details' + confirmation.id
         params = self._create_confirmation_params(tag)
@@ -78,32 +146,59 @@ class ConfirmationExecutor:
         return response.json()['html']
 
     def _create_confirmation_params(self, tag_string: str) -> dict:
-        timestamp = int(time.time())
-        confirmation_key = generate_confirmation_key(self._identity_secret, tag_string, timestamp)
-        android_id = generate_device_id(self._my_steam_id)
-        return {'p': android_id,
+        timestamp = self._keyring.time()
+        return {'p': self._keyring.device_id,
                 'a': self._my_steam_id,
-                'k': confirmation_key,
+                'k': self._keyring.confirmation_key(tag_string, timestamp),
                 't': timestamp,
                 'm': 'android',
                 'tag': tag_string}
 
     def _select_trade_offer_confirmation(self, confirmations: List[Confirmation], trade_offer_id: str) -> Confirmation:
         for confirmation in confirmations:
-            confirmation_details_page = self._fetch_confirmation_details_page(confirmation)
-            confirmation_id = self._get_confirmation_trade_offer_id(confirmation_details_page)
-            if confirmation_id == trade_offer_id:
+            if self._get_confirmation_details(confirmation) == ('trade_offers', trade_offer_id):
                 return confirmation
         raise ConfirmationExpected
 
     def _select_sell_listing_confirmation(self, confirmations: List[Confirmation], asset_id: str) -> Confirmation:
         for confirmation in confirmations:
-            confirmation_details_page = self._fetch_confirmation_details_page(confirmation)
-            confirmation_id = self._get_confirmation_sell_listing_id(confirmation_details_page)
-            if confirmation_id == asset_id:
+            if self._get_confirmation_details(confirmation) == ('sell_listings', asset_id):
                 return confirmation
         raise ConfirmationExpected
 
+    @staticmethod
+    def _create_confirm_many_results(trade_offer_ids: Iterable[str], asset_ids: Iterable[str]) -> dict:
+        return {'trade_offers': {str(trade_offer_id): False for trade_offer_id in trade_offer_ids},
+                'sell_listings': {str(asset_id): False for asset_id in asset_ids}}
+
+    @staticmethod
+    def _match_confirmations(confirmations: List[Confirmation], object_ids: List[Tuple[str, str]],
+                             results: dict) -> List[Tuple[Confirmation, str, str]]:
+        """ Return (confirmation, kind, id) for each confirmation whose id is requested in 'results' """
+        matches = []
+        for confirmation, (kind, object_id) in zip(confirmations, object_ids):
+            if kind is not None and object_id in results[kind]:
+                matches.append((confirmation, kind, object_id))
+        return matches
+
+    @staticmethod
+    def _fill_confirm_many_results(results: dict, matches: List[Tuple[Confirmation, str, str]],
+                                   response: dict) -> None:
+        success = bool(response.get('success'))
+        for _, kind, object_id in matches:
+            results[kind][object_id] = success
+
+    @classmethod
+    @instrumented_parser('confirmation.details')
+    def _get_confirmation_object_id(cls, confirmation_details_page: str) -> Tuple[str, str]:
+        """ Return ('trade_offers', trade_offer_id), ('sell_listings', asset_id) or (None, None) if unknown """
+        try:
+            if 'tradeofferid_' in confirmation_details_page:
+                return 'trade_offers', cls._get_confirmation_trade_offer_id(confirmation_details_page)
+            return 'sell_listings', cls._get_confirmation_sell_listing_id(confirmation_details_page)
+        except (IndexError, KeyError, ValueError):
+            return None, None
+
     @staticmethod
     def _get_confirmation_sell_listing_id(confirmation_details_page: str) -> str:
         soup = BeautifulSoup(confirmation_details_page, 'html.parser')
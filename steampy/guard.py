@@ -7,6 +7,12 @@ import os
 
 from hashlib import sha1
 
+import requests
+
+from .constants import API_URL
+
+QUERY_TIME_URL = API_URL + '/ITwoFactorService/QueryTime/v1/'
+
 
 def load_steam_guard(steam_guard: str) -> dict:
     if os.path.isfile(steam_guard):
@@ -19,8 +25,12 @@ def load_steam_guard(steam_guard: str) -> dict:
 def generate_one_time_code(shared_secret: str, timestamp: int = None) -> str:
     if timestamp is None:
         timestamp = int(time.time())
+    return _generate_one_time_code(base64.b64decode(shared_secret), timestamp)
+
+
+def _generate_one_time_code(shared_secret: bytes, timestamp: int) -> str:
     time_buffer = struct.pack('>Q', timestamp // 30)  # pack as Big endian, uint64
-    time_hmac = hmac.new(base64.b64decode(shared_secret), time_buffer, digestmod=sha1).digest()
+    time_hmac = hmac.new(shared_secret, time_buffer, digestmod=sha1).digest()
     begin = ord(time_hmac[19:20]) & 0xf
     full_code = struct.unpack('>I', time_hmac[begin:begin + 4])[0] & 0x7fffffff  # unpack as Big endian uint32
     chars = '23456789BCDFGHJKMNPQRTVWXY'
@@ -33,9 +43,15 @@ def generate_one_time_code(shared_secret: str, timestamp: int = None) -> str:
     return code
 
 
-def generate_confirmation_key(identity_secret: str, tag: str, timestamp: int = int(time.time())) -> bytes:
+def generate_confirmation_key(identity_secret: str, tag: str, timestamp: int = None) -> bytes:
+    if timestamp is None:
+        timestamp = int(time.time())
+    return _generate_confirmation_key(base64.b64decode(identity_secret), tag, timestamp)
+
+
+def _generate_confirmation_key(identity_secret: bytes, tag: str, timestamp: int) -> bytes:
     buffer = struct.pack('>Q', timestamp) + tag.encode('ascii')
-    return base64.b64encode(hmac.new(base64.b64decode(identity_secret), buffer, digestmod=sha1).digest())
+    return base64.b64encode(hmac.new(identity_secret, buffer, digestmod=sha1).digest())
 
 
 # It works, however it's different from the one generated from mobile app
@@ -46,3 +62,60 @@ def generate_device_id(steam_id: str) -> str:
                                   hexed_steam_id[12:16],
                                   hexed_steam_id[16:20],
                                   hexed_steam_id[20:32]])
+
+
+class GuardKeyring:
+    """
+    Steam Guard secrets of one account, decoded once.
+    The device id and the one-time code of the current 30 seconds window are memoized. Codes and confirmation keys use
+    the Steam time: local time plus 'time_offset', calibrated by 'sync_time'.
+    """
+
+    def __init__(self, shared_secret: str = None, identity_secret: str = None, steam_id: str = None,
+                 time_offset: int = 0) -> None:
+        self._shared_secret = base64.b64decode(shared_secret) if shared_secret else None
+        self._identity_secret = base64.b64decode(identity_secret) if identity_secret else None
+        self.steam_id = steam_id
+        self.time_offset = time_offset
+        self._device_id = None  # type: tuple
+        self._one_time_code = (None, None)
+
+    @classmethod
+    def from_steam_guard(cls, steam_guard: dict, steam_id: str = None) -> 'GuardKeyring':
+        return cls(steam_guard.get('shared_secret'), steam_guard.get('identity_secret'),
+                   steam_id or steam_guard.get('steamid'))
+
+    def time(self) -> int:
+        return int(time.time()) + self.time_offset
+
+    def sync_time(self, session: requests.Session = None, url: str = QUERY_TIME_URL) -> int:
+        """
+        Set 'time_offset' from the 'server_time' of ITwoFactorService/QueryTime, or of any endpoint answering
+        the same json at 'url'. Return the offset in seconds.
+        """
+        post = session.post if session is not None else requests.post
+        before = time.time()
+        response = post(url, data={'steamid': 0})
+        local_time = (before + time.time()) / 2
+        # server_time is truncated to the second
+        server_time = int(response.json()['response']['server_time']) + 0.5
+        self.time_offset = int(round(server_time - local_time))
+        return self.time_offset
+
+    def one_time_code(self, timestamp: int = None) -> str:
+        timestamp = timestamp if timestamp is not None else self.time()
+        window, code = self._one_time_code
+        if window != timestamp // 30:
+            code = _generate_one_time_code(self._shared_secret, timestamp)
+            self._one_time_code = (timestamp // 30, code)
+        return code
+
+    def confirmation_key(self, tag: str, timestamp: int = None) -> bytes:
+        timestamp = timestamp if timestamp is not None else self.time()
+        return _generate_confirmation_key(self._identity_secret, tag, timestamp)
+
+    @property
+    def device_id(self) -> str:
+        if self._device_id is None or self._device_id[0] != self.steam_id:
+            self._device_id = (self.steam_id, generate_device_id(self.steam_id))
+        return self._device_id[1]
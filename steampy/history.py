@@ -0,0 +1,72 @@
+import json
+import sqlite3
+import threading
+from typing import Iterable, Iterator, Tuple
+
+
+class SqliteMarketHistoryStore:
+    """
+    Local copy of the market history used by SteamMarket.sync_market_history.
+    Listings are keyed by 'listing_id' and ordered by 'position', 1 being the oldest event of the account.
+    The sync checkpoint ({'total_count': int, 'start': int or None}) is kept in the same database.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._connection:
+            self._connection.execute('CREATE TABLE IF NOT EXISTS listings '
+                                     '(listing_id TEXT PRIMARY KEY, position INTEGER NOT NULL, listing TEXT NOT NULL)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS listings_position ON listings (position)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS checkpoint (id INTEGER PRIMARY KEY, value TEXT)')
+
+    def add(self, listings: Iterable[Tuple[int, dict]]) -> None:
+        """ Store (position, listing) pairs, listings already stored are replaced """
+        rows = [(listing['listing_id'], position, json.dumps(listing)) for position, listing in listings]
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO listings (listing_id, position, listing) '
+                                         'VALUES (?, ?, ?)', rows)
+
+    def get(self, listing_id: str) -> dict:
+        with self._lock:
+            row = self._connection.execute('SELECT listing FROM listings WHERE listing_id = ?',
+                                           (listing_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def listings(self, newest_first: bool = True) -> Iterator[dict]:
+        order = 'DESC' if newest_first else 'ASC'
+        with self._lock:
+            rows = self._connection.execute('SELECT listing FROM listings ORDER BY position ' + order).fetchall()
+        for row in rows:
+            yield json.loads(row[0])
+
+    @property
+    def checkpoint(self) -> dict:
+        with self._lock:
+            row = self._connection.execute('SELECT value FROM checkpoint WHERE id = 0').fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    @checkpoint.setter
+    def checkpoint(self, checkpoint: dict) -> None:
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO checkpoint (id, value) VALUES (0, ?)',
+                                     (json.dumps(checkpoint),))
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def __contains__(self, listing_id: str) -> bool:
+        with self._lock:
+            return self._connection.execute('SELECT 1 FROM listings WHERE listing_id = ?',
+                                            (listing_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM listings').fetchone()[0]
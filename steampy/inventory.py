@@ -0,0 +1,103 @@
+import json
+
+from .models import GameOptions
+from .utils import get_description_key, merge_item
+
+
+class InventoryDiff:
+    def __init__(self, added: dict, removed: dict, changed: dict) -> None:
+        """ 'added' and 'removed' map assetid to the merged item, 'changed' maps it to (old item, new item) """
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self) -> str:
+        return 'InventoryDiff(added=%s, removed=%s, changed=%s)' % (len(self.added), len(self.removed),
+                                                                    len(self.changed))
+
+
+class InventorySnapshot:
+    """
+    Last fetched state of an inventory, keyed by assetid.
+    'refresh' fetches the inventory again and reports what changed; only the added or changed assets are merged
+    with their descriptions. Assets sent without description are left out until a later refresh gets it.
+    Use 'save' / 'load' to continue from the last snapshot after a restart.
+    """
+
+    def __init__(self, steam_id: str, game: GameOptions, page_size: int = 2000) -> None:
+        self.steam_id = steam_id
+        self.game = game
+        self.page_size = page_size
+        self.assets = {}
+        self.descriptions = {}
+        self.items = {}
+
+    def refresh(self, steam_client) -> InventoryDiff:
+        assets = {}
+        for page in steam_client.iter_inventory_pages(self.steam_id, self.game, self.page_size):
+            page_descriptions = None
+            for asset in page.get('assets', []):
+                description_key = get_description_key(asset)
+                if description_key not in self.descriptions:
+                    if page_descriptions is None:
+                        page_descriptions = {get_description_key(description): description
+                                             for description in page.get('descriptions', [])}
+                    if description_key not in page_descriptions:
+                        # left out until Steam sends its description, it is then reported as added
+                        continue
+                    self.descriptions[description_key] = page_descriptions[description_key]
+                assets[asset['assetid']] = asset
+        diff = self._apply(assets)
+        self._prune_descriptions()
+        return diff
+
+    def _apply(self, assets: dict) -> InventoryDiff:
+        added, removed, changed = {}, {}, {}
+        for asset_id in self.assets.keys() - assets.keys():
+            removed[asset_id] = self.items.pop(asset_id)
+        for asset_id, asset in assets.items():
+            old_asset = self.assets.get(asset_id)
+            if old_asset == asset:
+                continue
+            item = merge_item(asset, self.descriptions)
+            if old_asset is None:
+                added[asset_id] = item
+            else:
+                changed[asset_id] = (self.items[asset_id], item)
+            self.items[asset_id] = item
+        self.assets = assets
+        return InventoryDiff(added, removed, changed)
+
+    def _prune_descriptions(self) -> None:
+        used_keys = {get_description_key(asset) for asset in self.assets.values()}
+        for description_key in self.descriptions.keys() - used_keys:
+            del self.descriptions[description_key]
+
+    def to_dict(self) -> dict:
+        return {'steam_id': self.steam_id,
+                'app_id': self.game.app_id,
+                'context_id': self.game.context_id,
+                'page_size': self.page_size,
+                'assets': self.assets,
+                'descriptions': self.descriptions}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'InventorySnapshot':
+        snapshot = cls(data['steam_id'], GameOptions(data['app_id'], data['context_id']), data['page_size'])
+        snapshot.descriptions = data['descriptions']
+        snapshot.assets = data['assets']
+        snapshot.items = {asset_id: merge_item(asset, snapshot.descriptions)
+                          for asset_id, asset in snapshot.assets.items()}
+        return snapshot
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> 'InventorySnapshot':
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
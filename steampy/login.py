@@ -1,5 +1,7 @@
 import base64
 import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from steampy import guard
 import rsa
@@ -9,18 +11,32 @@ from .constants import COMMUNITY_URL, STORE_URL
 
 
 class LoginExecutor:
-    def __init__(self, username: str, password: str, shared_secret: str, session: requests.Session) -> None:
+    # seconds an rsa key (and the password encrypted with it) is reused by the next logins
+    RSA_KEY_TTL = 600
+
+    def __init__(self, username: str, password: str, shared_secret: str, session: requests.Session,
+                 keyring: guard.GuardKeyring = None) -> None:
         self.username = username
         self.password = password
         self.one_time_code = ""
         self.shared_secret = shared_secret
         self.session = session
+        self.keyring = keyring if keyring is not None else guard.GuardKeyring(shared_secret)
+        self._encrypted_password = None  # type: tuple
 
     def login(self) -> dict:
-        self.one_time_code = ""
+        """
+        With a 'shared_secret' the one-time code is sent with the first request, so a mobile authenticated account
+        logs in with one request instead of two. A cached rsa key rejected by Steam is fetched again once.
+        """
+        self.one_time_code = self.keyring.one_time_code() if self.shared_secret else ""
+        cached_key = self._encrypted_password is not None and self._encrypted_password[2] > time.time()
         login_response = self._send_login_request()
         self._check_for_captcha(login_response)
         login_response = self._enter_steam_guard_if_necessary(login_response)
+        if not login_response.json()['success'] and cached_key:
+            self._encrypted_password = None
+            login_response = self._enter_steam_guard_if_necessary(self._send_login_request())
         json_login_response = login_response.json()
         self._assert_valid_credentials(login_response)
         self._perform_redirects(json_login_response)
@@ -28,9 +44,7 @@ class LoginExecutor:
         return {"steamid": json_login_response["transfer_parameters"]["steamid"]}
 
     def _send_login_request(self) -> requests.Response:
-        rsa_params = self._fetch_rsa_params()
-        encrypted_password = self._encrypt_password(rsa_params)
-        rsa_timestamp = rsa_params['rsa_timestamp']
+        encrypted_password, rsa_timestamp = self._get_encrypted_password()
         request_data = self._prepare_login_request_data(encrypted_password, rsa_timestamp)
         return self.session.post(STORE_URL + '/login/dologin', data=request_data)
 
@@ -65,6 +79,15 @@ class LoginExecutor:
             else:
                 raise ValueError('Could not obtain rsa-key')
 
+    def _get_encrypted_password(self) -> tuple:
+        """ Return (encrypted password, rsa timestamp), the rsa key is fetched at most every RSA_KEY_TTL seconds """
+        if self._encrypted_password is not None and self._encrypted_password[2] > time.time():
+            return self._encrypted_password[:2]
+        rsa_params = self._fetch_rsa_params()
+        self._encrypted_password = (self._encrypt_password(rsa_params), rsa_params['rsa_timestamp'],
+                                    time.time() + self.RSA_KEY_TTL)
+        return self._encrypted_password[:2]
+
     def _encrypt_password(self, rsa_params: dict) -> str:
         return base64.b64encode(rsa.encrypt(self.password.encode('utf-8'), rsa_params['rsa_key']))
 
@@ -90,7 +113,10 @@ class LoginExecutor:
 
     def _enter_steam_guard_if_necessary(self, login_response: requests.Response) -> requests.Response:
         if login_response.json()['requires_twofactor']:
-            self.one_time_code = guard.generate_one_time_code(self.shared_secret)
+            if self.one_time_code:
+                # the code was refused, the local clock is probably off
+                self.keyring.sync_time(self.session)
+            self.one_time_code = self.keyring.one_time_code()
             return self._send_login_request()
         return login_response
 
@@ -103,8 +129,12 @@ class LoginExecutor:
         parameters = response_dict.get('transfer_parameters')
         if parameters is None:
             raise Exception('Cannot perform redirects after login, no parameters fetched')
-        for url in response_dict['transfer_urls']:
-            self.session.post(url, parameters)
+        urls = response_dict['transfer_urls']
+        if not urls:
+            return
+        with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+            # list() propagates the exceptions of the redirects
+            list(pool.map(lambda url: self.session.post(url, parameters), urls))
 
     def _fetch_home_page(self, session: requests.Session) -> requests.Response:
         return session.post(COMMUNITY_URL + '/my/home/')
@@ -1,21 +1,92 @@
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from itertools import takewhile
+from typing import Iterable, Iterator, Tuple
 
 import re
 from bs4 import BeautifulSoup, Tag
 from steampy.confirmation import ConfirmationExecutor
 
+from .cache import PriceCache
+from .history import SqliteMarketHistoryStore
 from .exceptions import SteamServerError, ApiException
-from .utils import handle_steam_response, extract_json, text_between
+from .utils import handle_steam_response, extract_json, text_between, parse_price_overviews
 from .constants import COMMUNITY_URL
-from .models import GameOptions, Currency
+from .metrics import instrumented_parser
+from .models import GameOptions, Currency, DescriptionRegistry
+from .parsers import MarketHistoryParser, get_default_market_history_parser
 from .session import SteamSession, login_required
 
 
 class SteamMarket:
-    def __init__(self, steam_session: SteamSession):
+    def __init__(self, steam_session: SteamSession, description_registry: DescriptionRegistry = None,
+                 market_history_parser: MarketHistoryParser = None, price_cache: PriceCache = None):
+        """
+        With a 'description_registry' listings share interned descriptions instead of holding their own.
+        'market_history_parser' defaults to the lxml backend when lxml is installed.
+        With a 'price_cache' fetch_price answers from it and collapses concurrent requests for the same item.
+        """
         self.steam_session = steam_session
+        self.description_registry = description_registry
+        self.market_history_parser = market_history_parser or get_default_market_history_parser()
+        self.price_cache = price_cache
 
     def fetch_price(self, market_hash_name: str, game: GameOptions, currency: str = Currency.USD) -> dict:
+        if self.price_cache is None:
+            return self._fetch_price(market_hash_name, game, currency)
+        key = self.price_cache.create_key(game.app_id, market_hash_name, currency)
+        return self.price_cache.get_or_fetch(key, lambda: self._fetch_price(market_hash_name, game, currency))
+
+    def fetch_prices(self, market_hash_names: Iterable[str], game: GameOptions, currency: str = Currency.USD,
+                     max_workers: int = 4, retries: int = 3, completed: Iterable[str] = (),
+                     failures: dict = None) -> Iterator[Tuple[str, dict]]:
+        """
+        Fetch the prices of many items concurrently and yield (market_hash_name, price) as they complete.
+        The throughput is bounded by the 'priceoverview' rate of the session rate limiter, which also retries the 429
+        responses. Other failed requests (5xx, connection errors) are retried 'retries' times with backoff.
+        Items still failing are yielded with a None price and their exception is stored in 'failures' if given.
+        Prices are 'fetch_price' responses with 'lowest_price_value', 'median_price_value' and 'volume_value'
+        parsed into numbers (see utils.parse_price_overviews), all the responses available at once are parsed together.
+        Names in 'completed' are skipped: pass the names already yielded to resume an interrupted batch.
+        """
+        completed = set(completed)
+        names = [name for name in dict.fromkeys(market_hash_names) if name not in completed]
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {pool.submit(self._fetch_price_with_retries, name, game, currency, retries): name for name in names}
+        try:
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                batch = []
+                for future in done:
+                    name = futures[future]
+                    error = future.exception()
+                    if error is not None and failures is not None:
+                        failures[name] = error
+                    batch.append((name, future.result() if error is None else None))
+                parse_price_overviews([price for _, price in batch if price is not None])
+                yield from batch
+        finally:
+            for future in futures:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def _fetch_price_with_retries(self, market_hash_name: str, game: GameOptions, currency: str,
+                                  retries: int) -> dict:
+        """ 429 responses are left to the session rate limiter, only the other server errors are retried here """
+        attempt = 0
+        while True:
+            try:
+                return self.fetch_price(market_hash_name, game, currency)
+            except SteamServerError:
+                if attempt >= retries:
+                    raise
+                rate_limiter = self.steam_session.rate_limiter
+                time.sleep(rate_limiter.backoff(attempt) if rate_limiter is not None else 2 ** attempt)
+                attempt += 1
+
+    def _fetch_price(self, market_hash_name: str, game: GameOptions, currency: str = Currency.USD) -> dict:
         url = COMMUNITY_URL + '/market/priceoverview/'
         params = {'currency': currency, 'appid': game.app_id, 'market_hash_name': market_hash_name}
         response = self.steam_session.get(url, params=params)
@@ -24,17 +95,25 @@ class SteamMarket:
         return response_json
 
     @login_required
-    def get_my_market_listings(self, fetch_all_sell_listings=True) -> dict:
+    def get_my_market_listings(self, fetch_all_sell_listings=True, page_size: int = None) -> dict:
+        """
+        The sell listings missing from the first page are fetched in one request, or by pages of 'page_size'
+        fetched concurrently when it is set (see iter_my_sell_listings).
+        """
         url = COMMUNITY_URL + "/market"
         response = self.steam_session.get(url, cookies={"ActListPageSize": "50"})
         handle_steam_response(response)
 
         try:
-            listings = self._get_listings_from_html(response.text)
+            listings = self._get_listings_from_html(response.text, self.description_registry)
             sell_listing_count = len(
                 [a for a in listings.get("sell_listings", {}).values() if not a["need_confirmation"]])
             if fetch_all_sell_listings and self._need_to_fetch_more_sell_listings(response.text):
-                more_sell_listings = self._get_sell_listings_from_endpoint(sell_listing_count)
+                if page_size is None:
+                    more_sell_listings = self._get_sell_listings_from_endpoint(sell_listing_count)["sell_listings"]
+                else:
+                    more_sell_listings = {listing["listing_id"]: listing for listing in
+                                          self.iter_my_sell_listings(sell_listing_count, page_size)}
                 listings["sell_listings"].update(more_sell_listings)
 
         except Exception as e:
@@ -42,24 +121,82 @@ class SteamMarket:
 
         return listings
 
+    @login_required
+    def iter_my_sell_listings(self, start: int = 0, page_size: int = 100, max_workers: int = 4) -> Iterator[dict]:
+        """
+        Yield the active sell listings from 'start', merged with their descriptions.
+        The first page gives the total count, the other pages are fetched concurrently and every page is parsed
+        and yielded as soon as it arrives, so listings are not ordered.
+        """
+        total_count, listings = self._get_sell_listings_page(start, page_size)
+        seen_listing_ids = set(listings)
+        yield from listings.values()
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        futures = [pool.submit(self._get_sell_listings_page, page_start, page_size)
+                   for page_start in range(start + page_size, total_count, page_size)]
+        try:
+            for future in as_completed(futures):
+                for listing_id, listing in future.result()[1].items():
+                    # listings created or removed while paging shift the pages
+                    if listing_id not in seen_listing_ids:
+                        seen_listing_ids.add(listing_id)
+                        yield listing
+        finally:
+            for future in futures:
+                future.cancel()
+            pool.shutdown(wait=False)
+
     @login_required
     def get_market_history(self, count=30, start=0) -> dict:
         url = COMMUNITY_URL + "/market/myhistory/render/?query=&start=%s&count=%s" % (start, count)
         response = self.steam_session.get(url)
         handle_steam_response(response)
         response_json = extract_json(response)
-        html = response_json.get("result_html")
-
-        if response_json.get("success") is False or response_json.get("total_count") is None or \
-                        '<div class="market_listing_table_message">There was an error' in html:
-            raise SteamServerError("Invalid response")
-
-        try:
-            dictionary_listings = self._get_market_history_from_json(response_json)
-        except Exception as e:
-            raise SteamServerError("Invalid response") from e
+        return self._parse_market_history_response(response_json, self.market_history_parser)
 
-        return dictionary_listings
+    @login_required
+    def sync_market_history(self, store: SqliteMarketHistoryStore, page_size: int = 100) -> int:
+        """
+        Download the market history events missing from 'store' and return how many were added.
+        Newest pages are read until an already stored 'listing_id' is met, so a sync of an up to date store costs
+        one request. The first sync writes every page with a checkpoint: an interrupted sync is resumed where it
+        stopped, shifted by the number of events added since.
+        """
+        checkpoint = store.checkpoint
+        backfill = len(store) == 0
+        resume_start = None
+        new_listings = []
+        added = 0
+        start = 0
+        while True:
+            history = self.get_market_history(page_size, start)
+            listings = history['listings']
+            total_count = history['total_count']
+            if start == 0 and checkpoint is not None and checkpoint['start'] is not None:
+                resume_start = checkpoint['start'] + total_count - checkpoint['total_count']
+            page = [(total_count - start - i, listing) for i, listing in enumerate(listings)]
+            start += len(listings)
+            finished = not listings or start >= total_count
+            if backfill:
+                page = [(position, listing) for position, listing in page if listing['listing_id'] not in store]
+                store.add(page)
+                added += len(page)
+                store.checkpoint = {'total_count': total_count, 'start': None if finished else start}
+                if finished:
+                    return added
+                continue
+            unseen = list(takewhile(lambda row: row[1]['listing_id'] not in store, page))
+            new_listings.extend(unseen)
+            if len(unseen) == len(page) and not finished:
+                continue
+            store.add(new_listings)
+            added += len(new_listings)
+            if finished or resume_start is None:
+                store.checkpoint = {'total_count': total_count, 'start': None}
+                return added
+            backfill = True
+            start = max(start, resume_start)
+            store.checkpoint = {'total_count': total_count, 'start': start}
 
     @login_required
     def create_sell_order(self, asset_id: str, game: GameOptions, money_to_receive: str) -> dict:
@@ -124,7 +261,9 @@ class SteamMarket:
     def _confirm_sell_listing(self, asset_id: str) -> dict:
         con_executor = ConfirmationExecutor(self.steam_session.steam_guard['identity_secret'],
                                             self.steam_session.steam_guard['steamid'],
-                                            self.steam_session)
+                                            self.steam_session,
+                                            self.steam_session.confirmation_cache,
+                                            self.steam_session.guard_keyring)
         try:
             return con_executor.confirm_sell_listing(asset_id)
         except Exception as e:
@@ -133,28 +272,32 @@ class SteamMarket:
     def _get_session_id(self) -> str:
         return self.steam_session.cookies.get_dict()['sessionid']
 
-    def _get_listings_from_html(self, html: str) -> dict:
-        listings = self._extract_listing_from_html(html)
+    @classmethod
+    @instrumented_parser('market.listings_html')
+    def _get_listings_from_html(cls, html: str, registry: DescriptionRegistry = None) -> dict:
+        listings = cls._extract_listing_from_html(html)
         assets_descriptions = json.loads(text_between(html, "var g_rgAssets = ", ";\r\n"))
-        listing_id_to_assets_address = self._get_listing_id_to_assets_address_from_html(html)
-        listings = self._merge_listings_with_descriptions(listings, listing_id_to_assets_address, assets_descriptions)
+        listing_id_to_assets_address = cls._get_listing_id_to_assets_address_from_html(html)
+        listings = cls._merge_listings_with_descriptions(listings, listing_id_to_assets_address, assets_descriptions,
+                                                         registry)
         return listings
 
-    def _extract_listing_from_html(self, html: str) -> dict:
+    @classmethod
+    def _extract_listing_from_html(cls, html: str) -> dict:
         doc = BeautifulSoup(html, "html.parser")
         listings_nodes = doc.select("div[id=myListings]")[0].select("div.market_home_listing_table")
         sell_listings_dict = {}
         buy_orders_dict = {}
         for node in listings_nodes:
             if "My sell listings" in node.text:
-                sell_listings_dict = self._get_sell_listings_from_node(node)
+                sell_listings_dict = cls._get_sell_listings_from_node(node)
             elif "My listings awaiting confirmation" in node.text:
-                sell_listings_awaiting_conf = self._get_sell_listings_from_node(node)
+                sell_listings_awaiting_conf = cls._get_sell_listings_from_node(node)
                 for listing in sell_listings_awaiting_conf.values():
                     listing["need_confirmation"] = True
                 sell_listings_dict.update(sell_listings_awaiting_conf)
             elif "My buy orders" in node.text:
-                buy_orders_dict = self._get_buy_orders_from_node(node)
+                buy_orders_dict = cls._get_buy_orders_from_node(node)
         return {"buy_orders": buy_orders_dict, "sell_listings": sell_listings_dict}
 
     @staticmethod
@@ -197,11 +340,12 @@ class SteamMarket:
         return listing_id_to_assets_address
 
     @staticmethod
-    def _merge_listings_with_descriptions(listings: dict, ids_to_assets_address: dict, descriptions: dict) -> dict:
+    def _merge_listings_with_descriptions(listings: dict, ids_to_assets_address: dict, descriptions: dict,
+                                          registry: DescriptionRegistry = None) -> dict:
         for listing_id, listing in listings.get("sell_listings").items():
             asset_address = ids_to_assets_address[listing_id]
             description = descriptions[asset_address[0]][asset_address[1]][asset_address[2]]
-            listing["description"] = description
+            listing["description"] = registry.intern(description) if registry is not None else description
         return listings
 
     @staticmethod
@@ -213,84 +357,41 @@ class SteamMarket:
         return False
 
     def _get_sell_listings_from_endpoint(self, start: int) -> dict:
-        params = {"query": "", "start": start, "count": -1}
+        return {"sell_listings": self._get_sell_listings_page(start, -1)[1]}
+
+    def _get_sell_listings_page(self, start: int, count: int) -> Tuple[int, dict]:
+        """ Return (total count of sell listings, {listing id: listing} of the page) """
+        params = {"query": "", "start": start, "count": count}
         url = COMMUNITY_URL + "/market/mylistings/render/"
         response = self.steam_session.get(url, params=params)
         handle_steam_response(response)
         response_json = extract_json(response)
-        document = BeautifulSoup(response_json.get("results_html"), "html.parser")
-
-        id_to_assets_address = self._get_listing_id_to_assets_address_from_html(response_json.get("hovers"))
-        listings = self._get_sell_listings_from_node(document)
-        listings = self._merge_listings_with_descriptions(listings, id_to_assets_address, response_json.get("assets"))
-        return {"sell_listings": listings}
+        listings = self._get_sell_listings_from_endpoint_json(response_json, self.description_registry)
+        return response_json.get("total_count", 0), listings["sell_listings"]
 
-    @staticmethod
-    def _get_market_history_from_json(response_json: dict) -> dict:
+    @classmethod
+    @instrumented_parser('market.sell_listings_json')
+    def _get_sell_listings_from_endpoint_json(cls, response_json: dict, registry: DescriptionRegistry = None) -> dict:
+        document = BeautifulSoup(response_json.get("results_html"), "html.parser")
+        id_to_assets_address = cls._get_listing_id_to_assets_address_from_html(response_json.get("hovers"))
+        listings = {"sell_listings": cls._get_sell_listings_from_node(document)}
+        return cls._merge_listings_with_descriptions(listings, id_to_assets_address, response_json.get("assets"),
+                                                     registry)
+
+    @classmethod
+    @instrumented_parser('market.history')
+    def _parse_market_history_response(cls, response_json: dict, parser: MarketHistoryParser = None) -> dict:
         html = response_json.get("result_html")
-        r = "[\w]+\( [\w]+, '(history_row_[\d_]+_name)', ([\d]+), '([\d]+)', '([\d]+)', [\d]+ \);"
-        transaction_to_data = {}
-        for match in re.findall(r, html):
-            transaction_id = match[0]
-            appid = match[1]
-            contextid = match[2]
-            itemid = match[3]
-            transaction_to_data[transaction_id] = (appid, contextid, itemid)
-
-        assets_dictionary = {}
-        for appid in response_json.get("assets", {}):
-            for contextid in assets_dictionary[appid]:
-                for itemid, value in assets_dictionary[appid][contextid].items():
-                    assets_dictionary[(appid, contextid, itemid)] = value
-
-        listings = []
-        soup = BeautifulSoup(html, "html.parser")
-        divs = soup.select('div[class="market_listing_row market_recent_listing_row"]')
-        for div in divs:
-            listed_dates = div.find_all("div", class_="market_listing_listed_date")
-            listedon_raw = listed_dates[1].text.strip()
-            actedon_raw = listed_dates[0].text.strip()
-            actedwith_div = div.find_all("div", class_="market_listing_whoactedwith")[0]
-            price_raw = div.find_all("span", class_="market_listing_price")[0].text.strip()
-            item_span = div.find_all("span", class_="market_listing_item_name")[0]
-            item_name = item_span.text.strip()
-            listing_id = div.get("id").replace("history_row_", "")
+        if response_json.get("success") is False or response_json.get("total_count") is None or \
+                        '<div class="market_listing_table_message">There was an error' in html:
+            raise SteamServerError("Invalid response")
 
-            listing = {
-                "item_name": item_name,
-                "listed_on": listedon_raw,
-                "acted_on": actedon_raw,
-                "price": price_raw,
-                "listing_id": listing_id,
-            }
+        try:
+            return cls._get_market_history_from_json(response_json, parser)
+        except Exception as e:
+            raise SteamServerError("Invalid response") from e
 
-            if "Listing created" in actedwith_div.text:
-                listing["action"] = 1
-            elif "Listing canceled" in actedwith_div.text:
-                listing["action"] = 2
-            elif "Listing expired" in actedwith_div.text:
-                listing["action"] = 5
-            else:
-                url = actedwith_div.span.span.a.get("href")
-                image = actedwith_div.span.span.a.img.get("src")
-                name = actedwith_div.div.text.strip()
-                listing["user"] = {"profile_url": url, "image_url": image}
-                sign = div.find_all("div", class_="market_listing_gainorloss")[0].text.strip()
-                if sign == "+":
-                    listing["user"]["name"] = name.replace("Seller:", "").strip()
-                    listing["action"] = 3
-                else:
-                    listing["user"]["name"] = name.replace("Buyer:", "").strip()
-                    listing["action"] = 4
-                key = transaction_to_data.get(item_span.get("id"), "")
-                if key in assets_dictionary:
-                    listing["description"] = assets_dictionary[key]
-            listings.append(listing)
-
-        data_dictionary = {
-            "total_count": response_json.get("total_count"),
-            "pagesize": response_json.get("pagesize"),
-            "listings": listings,
-            "start": response_json.get("start")
-        }
-        return data_dictionary
+    @staticmethod
+    def _get_market_history_from_json(response_json: dict, parser: MarketHistoryParser = None) -> dict:
+        parser = parser or get_default_market_history_parser()
+        return parser.parse(response_json)
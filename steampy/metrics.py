@@ -0,0 +1,197 @@
+import bisect
+import functools
+import re
+import threading
+import time
+import urllib.parse as urlparse
+from collections import Counter
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+
+NUMERIC_SEGMENT = re.compile('/\\d+(?=/|$)')
+
+
+def get_endpoint(url: str) -> str:
+    """ Url path with the numeric segments (steam ids, offer ids...) replaced by ':id', used as metric label """
+    return NUMERIC_SEGMENT.sub('/:id', urlparse.urlsplit(url).path.rstrip('/')) or '/'
+
+
+class Instrumentation:
+    """
+    Hooks called by the sessions for every request and by the parsers, they do nothing by default.
+    Subclass it and register it with 'set_instrumentation' to record metrics; subclasses are 'enabled'.
+    """
+    enabled = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.enabled = True
+
+    def on_response(self, method: str, endpoint: str, status_code: int, seconds: float, bytes_sent: int,
+                    bytes_received: int) -> None:
+        pass
+
+    def on_error(self, method: str, endpoint: str, seconds: float, error: Exception) -> None:
+        pass
+
+    def on_parse(self, parser: str, seconds: float) -> None:
+        pass
+
+
+_instrumentation = Instrumentation()
+
+
+def get_instrumentation() -> Instrumentation:
+    return _instrumentation
+
+
+def set_instrumentation(instrumentation: Instrumentation = None) -> None:
+    """ Install 'instrumentation' for every session and parser, None restores the no-op hooks """
+    global _instrumentation
+    _instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+
+
+def instrumented_parser(name: str):
+    """ Report the time spent in the decorated function to 'on_parse' under 'name' """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            instrumentation = _instrumentation
+            if not instrumentation.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                instrumentation.on_parse(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+class Histogram:
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+
+    def __init__(self, buckets: tuple = BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """ Upper bound of the bucket holding the 'q' quantile """
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if count and cumulative >= rank:
+                return bound
+        return 0.0
+
+    def to_dict(self) -> dict:
+        return {'count': self.count,
+                'sum': self.sum,
+                'p50': self.quantile(0.5),
+                'p90': self.quantile(0.9),
+                'p99': self.quantile(0.99)}
+
+
+class MetricsRecorder(Instrumentation):
+    """ Keeps the metrics in memory: latency histograms per (method, endpoint), counters and parse times """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.status_codes = Counter()
+        self.throttled = Counter()
+        self.errors = Counter()
+        self.bytes_sent = Counter()
+        self.bytes_received = Counter()
+        self.parse_times = {}
+
+    def on_response(self, method: str, endpoint: str, status_code: int, seconds: float, bytes_sent: int,
+                    bytes_received: int) -> None:
+        with self._lock:
+            self._get_histogram(self.latencies, (method, endpoint)).observe(seconds)
+            self.status_codes[(endpoint, status_code)] += 1
+            if status_code == 429:
+                self.throttled[endpoint] += 1
+            self.bytes_sent[endpoint] += bytes_sent
+            self.bytes_received[endpoint] += bytes_received
+
+    def on_error(self, method: str, endpoint: str, seconds: float, error: Exception) -> None:
+        with self._lock:
+            self._get_histogram(self.latencies, (method, endpoint)).observe(seconds)
+            self.errors[endpoint] += 1
+
+    def on_parse(self, parser: str, seconds: float) -> None:
+        with self._lock:
+            self._get_histogram(self.parse_times, parser).observe(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {'latencies': {'%s %s' % key: histogram.to_dict() for key, histogram in self.latencies.items()},
+                    'status_codes': {'%s %s' % key: count for key, count in self.status_codes.items()},
+                    'throttled': dict(self.throttled),
+                    'errors': dict(self.errors),
+                    'bytes_sent': dict(self.bytes_sent),
+                    'bytes_received': dict(self.bytes_received),
+                    'parse_times': {name: histogram.to_dict() for name, histogram in self.parse_times.items()}}
+
+    @staticmethod
+    def _get_histogram(histograms: dict, key) -> Histogram:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram()
+        return histogram
+
+
+class PrometheusExporter(Instrumentation):
+    """ Exports the metrics to a prometheus_client registry (the default one unless 'registry' is given) """
+
+    def __init__(self, registry=None, namespace: str = 'steampy') -> None:
+        if prometheus_client is None:
+            raise ImportError('PrometheusExporter requires prometheus_client, '
+                              'install it with "pip install prometheus_client"')
+        registry = registry if registry is not None else prometheus_client.REGISTRY
+        options = {'namespace': namespace, 'registry': registry}
+        self.request_duration = prometheus_client.Histogram('request_duration_seconds', 'Steam request latency',
+                                                            ['method', 'endpoint'], **options)
+        self.responses = prometheus_client.Counter('responses_total', 'Steam responses by status code',
+                                                   ['endpoint', 'status_code'], **options)
+        self.throttled = prometheus_client.Counter('throttled_total', 'Steam 429 responses', ['endpoint'], **options)
+        self.errors = prometheus_client.Counter('request_errors_total', 'Steam requests failed without response',
+                                                ['endpoint'], **options)
+        self.bytes_sent = prometheus_client.Counter('sent_bytes_total', 'Request bytes sent to Steam', ['endpoint'],
+                                                    **options)
+        self.bytes_received = prometheus_client.Counter('received_bytes_total', 'Response bytes received from Steam',
+                                                        ['endpoint'], **options)
+        self.parse_duration = prometheus_client.Histogram('parse_duration_seconds', 'Response parsing time',
+                                                          ['parser'], **options)
+
+    def on_response(self, method: str, endpoint: str, status_code: int, seconds: float, bytes_sent: int,
+                    bytes_received: int) -> None:
+        self.request_duration.labels(method, endpoint).observe(seconds)
+        self.responses.labels(endpoint, str(status_code)).inc()
+        if status_code == 429:
+            self.throttled.labels(endpoint).inc()
+        self.bytes_sent.labels(endpoint).inc(bytes_sent)
+        self.bytes_received.labels(endpoint).inc(bytes_received)
+
+    def on_error(self, method: str, endpoint: str, seconds: float, error: Exception) -> None:
+        self.request_duration.labels(method, endpoint).observe(seconds)
+        self.errors.labels(endpoint).inc()
+
+    def on_parse(self, parser: str, seconds: float) -> None:
+        self.parse_duration.labels(parser).observe(seconds)
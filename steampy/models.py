@@ -1,5 +1,9 @@
+import array
 import enum
+import threading
+import weakref
 from collections import namedtuple
+from collections.abc import Mapping
 
 
 class GameOptions:
@@ -50,3 +54,299 @@ class TradeOfferState(enum.IntEnum):
     CanceledBySecondaryFactor = 10
     StateInEscrow = 11
 
+
+
+class Description(dict):
+    """ Read only item description, shared by every item of the same class through DescriptionRegistry """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('Description is shared between items and can not be modified')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self) -> dict:
+        return dict(self)
+
+    def __reduce__(self):
+        return Description, (dict(self),)
+
+
+class ItemView(Mapping):
+    """
+    Merged item (description + 'contextid', 'id' and 'amount') that references a shared Description instead of
+    copying it. Use 'to_dict()' to get the same plain dict that 'utils.merge_items' returns.
+    """
+    __slots__ = ('description', 'contextid', 'id', 'amount')
+    OWN_KEYS = ('contextid', 'id', 'amount')
+
+    def __init__(self, description: Description, contextid: str, id: str, amount: str) -> None:
+        self.description = description
+        self.contextid = contextid
+        self.id = id
+        self.amount = amount
+
+    def __getitem__(self, key: str):
+        if key in self.OWN_KEYS:
+            return getattr(self, key)
+        return self.description[key]
+
+    def __iter__(self):
+        for key in self.description:
+            if key not in self.OWN_KEYS:
+                yield key
+        yield from self.OWN_KEYS
+
+    def __len__(self) -> int:
+        return len(self.description) + sum(1 for key in self.OWN_KEYS if key not in self.description)
+
+    def to_dict(self) -> dict:
+        item = dict(self.description)
+        item['contextid'] = self.contextid
+        item['id'] = self.id
+        item['amount'] = self.amount
+        return item
+
+    def __repr__(self) -> str:
+        return 'ItemView(%r)' % self.to_dict()
+
+
+class DescriptionRegistry:
+    """
+    Interns item descriptions by (appid, classid, instanceid) so that all the items of one class, across inventories,
+    offers and listings, share one Description. Descriptions are dropped once no item references them.
+    """
+
+    def __init__(self) -> None:
+        self._descriptions = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def intern(self, description: dict) -> Description:
+        if isinstance(description, Description):
+            return description
+        key = (str(description.get('appid', '')), description['classid'], description['instanceid'])
+        with self._lock:
+            interned = self._descriptions.get(key)
+            if interned is None:
+                interned = Description(description)
+                self._descriptions[key] = interned
+            return interned
+
+    def __len__(self) -> int:
+        return len(self._descriptions)
+
+
+class Item:
+    """
+    Compact item of an inventory or a trade offer, its description is shared and not copied.
+    'id_key' is the key of the asset id in the Steam asset: 'assetid', or 'id' in the legacy inventory.
+    """
+    __slots__ = ('appid', 'contextid', 'assetid', 'classid', 'instanceid', 'amount', 'description', 'extra', 'id_key')
+    ASSET_KEYS = ('appid', 'contextid', 'assetid', 'classid', 'instanceid', 'amount')
+
+    def __init__(self, appid, contextid: str, assetid: str, classid: str, instanceid: str, amount: str,
+                 description: dict = None, extra: dict = None, id_key: str = 'assetid') -> None:
+        self.appid = appid
+        self.contextid = contextid
+        self.assetid = assetid
+        self.classid = classid
+        self.instanceid = instanceid
+        self.amount = amount
+        self.description = description
+        self.extra = extra or None
+        self.id_key = id_key
+
+    @classmethod
+    def from_asset(cls, asset: dict, descriptions: dict = None, registry: DescriptionRegistry = None,
+                   context_id: str = None) -> 'Item':
+        """ 'descriptions' is keyed like utils.get_description_key """
+        description = None
+        if descriptions is not None:
+            description = descriptions.get(asset['classid'] + '_' + asset['instanceid'])
+            if description is not None and registry is not None:
+                description = registry.intern(description)
+        id_key = 'assetid' if 'assetid' in asset else 'id'
+        extra = {key: value for key, value in asset.items() if key not in cls.ASSET_KEYS and key != id_key}
+        return cls(asset.get('appid'), asset.get('contextid') or context_id, asset[id_key], asset['classid'],
+                   asset['instanceid'], asset['amount'], description, extra, id_key)
+
+    @classmethod
+    def from_inventory_response(cls, inventory_response: dict, registry: DescriptionRegistry = None) -> list:
+        descriptions = {description['classid'] + '_' + description['instanceid']: description
+                        for description in inventory_response.get('descriptions', [])}
+        return [cls.from_asset(asset, descriptions, registry) for asset in inventory_response.get('assets', [])]
+
+    def to_asset_dict(self) -> dict:
+        """ The asset as returned by Steam """
+        asset = {key: getattr(self, key) for key in self.ASSET_KEYS if getattr(self, key) is not None}
+        if self.id_key != 'assetid':
+            asset[self.id_key] = asset.pop('assetid')
+        if self.extra:
+            asset.update(self.extra)
+        return asset
+
+    def to_dict(self) -> dict:
+        """ The item as merged by utils.merge_item """
+        item = dict(self.description or {})
+        item['contextid'] = self.contextid
+        item['id'] = self.assetid
+        item['amount'] = self.amount
+        return item
+
+    def __repr__(self) -> str:
+        return 'Item(%s_%s_%s)' % (self.appid, self.contextid, self.assetid)
+
+
+class TradeOffer:
+    """ Compact trade offer of the IEconService api """
+    __slots__ = ('tradeofferid', 'accountid_other', 'message', 'expiration_time', 'trade_offer_state',
+                 'items_to_give', 'items_to_receive', 'is_our_offer', 'time_created', 'time_updated',
+                 'from_real_time_trade', 'escrow_end_date', 'confirmation_method', 'tradeid', 'extra')
+    FIELDS = __slots__[:-1]
+    ITEM_FIELDS = ('items_to_give', 'items_to_receive')
+
+    def __init__(self, **fields) -> None:
+        for key in self.FIELDS:
+            setattr(self, key, fields.pop(key, None))
+        self.extra = fields or None
+
+    @classmethod
+    def from_dict(cls, offer: dict, descriptions: dict = None, registry: DescriptionRegistry = None) -> 'TradeOffer':
+        fields = dict(offer)
+        for key in cls.ITEM_FIELDS:
+            if key in fields:
+                fields[key] = [Item.from_asset(asset, descriptions, registry) for asset in fields[key]]
+        return cls(**fields)
+
+    @classmethod
+    def from_offers_response(cls, offers_response: dict, registry: DescriptionRegistry = None) -> list:
+        """ Return the received and the sent offers of a 'get_trade_offers(...)' response """
+        response = offers_response['response']
+        descriptions = {description['classid'] + '_' + description['instanceid']: description
+                        for description in response.get('descriptions', [])}
+        offers = response.get('trade_offers_received', []) + response.get('trade_offers_sent', [])
+        return [cls.from_dict(offer, descriptions, registry) for offer in offers]
+
+    def to_dict(self, merge: bool = False) -> dict:
+        """ The offer as returned by Steam or, with 'merge', as returned by utils.merge_items_with_descriptions... """
+        offer = {}
+        for key in self.FIELDS:
+            value = getattr(self, key)
+            if value is None:
+                continue
+            if key in self.ITEM_FIELDS:
+                value = {item.assetid: item.to_dict() for item in value} if merge else \
+                    [item.to_asset_dict() for item in value]
+            offer[key] = value
+        if merge:
+            for key in self.ITEM_FIELDS:
+                offer.setdefault(key, {})
+        if self.extra:
+            offer.update(self.extra)
+        return offer
+
+    def __repr__(self) -> str:
+        return 'TradeOffer(%s)' % self.tradeofferid
+
+
+class Listing:
+    """ Compact sell listing of SteamMarket.get_my_market_listings """
+    __slots__ = ('listing_id', 'buyer_pay', 'you_receive', 'created_on', 'need_confirmation', 'description', 'extra')
+    FIELDS = __slots__[:-1]
+
+    def __init__(self, **fields) -> None:
+        for key in self.FIELDS:
+            setattr(self, key, fields.pop(key, None))
+        self.extra = fields or None
+
+    @classmethod
+    def from_dict(cls, listing: dict, registry: DescriptionRegistry = None) -> 'Listing':
+        fields = dict(listing)
+        if registry is not None and fields.get('description') is not None:
+            fields['description'] = registry.intern(fields['description'])
+        return cls(**fields)
+
+    def to_dict(self) -> dict:
+        listing = {key: getattr(self, key) for key in self.FIELDS if getattr(self, key) is not None}
+        if self.extra:
+            listing.update(self.extra)
+        return listing
+
+    def __repr__(self) -> str:
+        return 'Listing(%s)' % self.listing_id
+
+
+class InventoryTable:
+    """
+    Columnar inventory: one array per field instead of one dict per item.
+    'descriptions' are kept once per class, so rows convert back to asset or merged item dicts.
+    """
+    COLUMNS = (('assetid', 'Q'), ('classid', 'Q'), ('instanceid', 'Q'), ('amount', 'Q'),
+               ('tradable', 'B'), ('marketable', 'B'))
+
+    def __init__(self, appid, contextid: str) -> None:
+        self.appid = appid
+        self.contextid = contextid
+        self.columns = {name: array.array(typecode) for name, typecode in self.COLUMNS}
+        self.descriptions = {}
+
+    @classmethod
+    def from_inventory_response(cls, inventory_response: dict, game: GameOptions = None) -> 'InventoryTable':
+        assets = inventory_response.get('assets', [])
+        if game is not None:
+            table = cls(int(game.app_id), game.context_id)
+        else:
+            table = cls(assets[0]['appid'] if assets else None, assets[0]['contextid'] if assets else None)
+        table.extend(inventory_response)
+        return table
+
+    def extend(self, inventory_response: dict) -> None:
+        """ Append the assets of one inventory page """
+        for description in inventory_response.get('descriptions', []):
+            self.descriptions.setdefault(description['classid'] + '_' + description['instanceid'], description)
+        columns = self.columns
+        for asset in inventory_response.get('assets', []):
+            description = self.descriptions.get(asset['classid'] + '_' + asset['instanceid'], {})
+            columns['assetid'].append(int(asset['assetid']))
+            columns['classid'].append(int(asset['classid']))
+            columns['instanceid'].append(int(asset['instanceid']))
+            columns['amount'].append(int(asset['amount']))
+            columns['tradable'].append(int(description.get('tradable', 0)))
+            columns['marketable'].append(int(description.get('marketable', 0)))
+
+    def __len__(self) -> int:
+        return len(self.columns['assetid'])
+
+    def __getitem__(self, index: int) -> dict:
+        """ The asset dict of row 'index', as returned by Steam """
+        columns = self.columns
+        return {'appid': self.appid,
+                'contextid': self.contextid,
+                'assetid': str(columns['assetid'][index]),
+                'classid': str(columns['classid'][index]),
+                'instanceid': str(columns['instanceid'][index]),
+                'amount': str(columns['amount'][index])}
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def item(self, index: int) -> dict:
+        """ The merged item dict of row 'index', as returned by utils.merge_item, or the asset without description """
+        asset = self[index]
+        description = self.descriptions.get(asset['classid'] + '_' + asset['instanceid'])
+        if description is None:
+            return asset
+        item = dict(description)
+        item['contextid'] = asset['contextid']
+        item['id'] = asset['assetid']
+        item['amount'] = asset['amount']
+        return item
+
+    def to_numpy(self):
+        """ Return a numpy structured array, numpy has to be installed """
+        import numpy
+        dtype = [(name, numpy.uint64 if typecode == 'Q' else numpy.bool_) for name, typecode in self.COLUMNS]
+        table = numpy.empty(len(self), dtype=dtype)
+        for name, typecode in self.COLUMNS:
+            table[name] = numpy.frombuffer(self.columns[name], dtype=numpy.uint64 if typecode == 'Q' else numpy.uint8)
+        return table
@@ -0,0 +1,154 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Iterator, Tuple
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+
+LISTING_EVENT_ACTIONS = (("Listing created", 1), ("Listing canceled", 2), ("Listing expired", 5))
+HOVER_REGEX = re.compile(r"[\w]+\( [\w]+, '(history_row_[\d_]+_name)', ([\d]+), '([\d]+)', '([\d]+)', [\d]+ \);")
+
+
+class MarketHistoryParser(ABC):
+    """
+    Turns a '/market/myhistory/render/' response into the dict returned by SteamMarket.get_market_history.
+    Subclasses only implement '_parse_rows' for a given html library.
+    """
+
+    def parse(self, response_json: dict) -> dict:
+        html = response_json.get("result_html")
+        transaction_to_data = {}
+        for transaction_id, appid, contextid, itemid in HOVER_REGEX.findall(html):
+            transaction_to_data[transaction_id] = (appid, contextid, itemid)
+
+        assets_dictionary = {}
+        for appid, contexts in (response_json.get("assets") or {}).items():
+            for contextid, items in contexts.items():
+                for itemid, value in items.items():
+                    assets_dictionary[(appid, contextid, itemid)] = value
+
+        listings = []
+        for listing, item_name_id in self._parse_rows(html):
+            if "user" in listing:
+                key = transaction_to_data.get(item_name_id)
+                if key in assets_dictionary:
+                    listing["description"] = assets_dictionary[key]
+            listings.append(listing)
+
+        return {
+            "total_count": response_json.get("total_count"),
+            "pagesize": response_json.get("pagesize"),
+            "listings": listings,
+            "start": response_json.get("start")
+        }
+
+    @abstractmethod
+    def _parse_rows(self, html: str) -> Iterator[Tuple[dict, str]]:
+        """ Yield (listing, id of the item name span) for every history row """
+
+    @staticmethod
+    def _get_listing_event_action(acted_with_text: str) -> int:
+        for event, action in LISTING_EVENT_ACTIONS:
+            if event in acted_with_text:
+                return action
+        return None
+
+    @staticmethod
+    def _add_user(listing: dict, url: str, image: str, name: str, sign: str) -> None:
+        listing["user"] = {"profile_url": url, "image_url": image}
+        if sign == "+":
+            listing["user"]["name"] = name.replace("Seller:", "").strip()
+            listing["action"] = 3
+        else:
+            listing["user"]["name"] = name.replace("Buyer:", "").strip()
+            listing["action"] = 4
+
+
+class BeautifulSoupMarketHistoryParser(MarketHistoryParser):
+    def _parse_rows(self, html: str) -> Iterator[Tuple[dict, str]]:
+        soup = BeautifulSoup(html, "html.parser")
+        for div in soup.select('div[class="market_listing_row market_recent_listing_row"]'):
+            listed_dates = div.find_all("div", class_="market_listing_listed_date")
+            actedwith_div = div.find_all("div", class_="market_listing_whoactedwith")[0]
+            item_span = div.find_all("span", class_="market_listing_item_name")[0]
+            listing = {
+                "item_name": item_span.text.strip(),
+                "listed_on": listed_dates[1].text.strip(),
+                "acted_on": listed_dates[0].text.strip(),
+                "price": div.find_all("span", class_="market_listing_price")[0].text.strip(),
+                "listing_id": div.get("id").replace("history_row_", ""),
+            }
+            action = self._get_listing_event_action(actedwith_div.text)
+            if action is not None:
+                listing["action"] = action
+            else:
+                link = actedwith_div.span.span.a
+                sign = div.find_all("div", class_="market_listing_gainorloss")[0].text.strip()
+                self._add_user(listing, link.get("href"), link.img.get("src"), actedwith_div.div.text.strip(), sign)
+            yield listing, item_span.get("id")
+
+
+def _has_class(class_name: str) -> str:
+    return 'contains(concat(" ", normalize-space(@class), " "), " %s ")' % class_name
+
+
+class LxmlMarketHistoryParser(MarketHistoryParser):
+    """ Same output as BeautifulSoupMarketHistoryParser, several times faster. Requires lxml. """
+    ROWS = '//div[@class="market_listing_row market_recent_listing_row"]'
+    LISTED_DATES = './/div[%s]' % _has_class('market_listing_listed_date')
+    ACTED_WITH = '(.//div[%s])[1]' % _has_class('market_listing_whoactedwith')
+    PRICE = '(.//span[%s])[1]' % _has_class('market_listing_price')
+    ITEM_NAME = '(.//span[%s])[1]' % _has_class('market_listing_item_name')
+    GAIN_OR_LOSS = '(.//div[%s])[1]' % _has_class('market_listing_gainorloss')
+
+    def __init__(self) -> None:
+        if lxml is None:
+            raise ImportError('LxmlMarketHistoryParser requires lxml, install it with "pip install lxml"')
+        self._rows = lxml.etree.XPath(self.ROWS)
+        self._listed_dates = lxml.etree.XPath(self.LISTED_DATES)
+        self._acted_with = lxml.etree.XPath(self.ACTED_WITH)
+        self._price = lxml.etree.XPath(self.PRICE)
+        self._item_name = lxml.etree.XPath(self.ITEM_NAME)
+        self._gain_or_loss = lxml.etree.XPath(self.GAIN_OR_LOSS)
+        self._first_span = lxml.etree.XPath('(.//span)[1]')
+        self._first_link = lxml.etree.XPath('(.//a)[1]')
+        self._first_image = lxml.etree.XPath('(.//img)[1]')
+        self._first_div = lxml.etree.XPath('(.//div)[1]')
+
+    def _parse_rows(self, html: str) -> Iterator[Tuple[dict, str]]:
+        if not html.strip():
+            return
+        document = lxml.html.document_fromstring(html)
+        for div in self._rows(document):
+            listed_dates = self._listed_dates(div)
+            actedwith_div = self._acted_with(div)[0]
+            item_span = self._item_name(div)[0]
+            listing = {
+                "item_name": item_span.text_content().strip(),
+                "listed_on": listed_dates[1].text_content().strip(),
+                "acted_on": listed_dates[0].text_content().strip(),
+                "price": self._price(div)[0].text_content().strip(),
+                "listing_id": div.get("id").replace("history_row_", ""),
+            }
+            action = self._get_listing_event_action(actedwith_div.text_content())
+            if action is not None:
+                listing["action"] = action
+            else:
+                link = self._first_link(self._first_span(self._first_span(actedwith_div)[0])[0])[0]
+                sign = self._gain_or_loss(div)[0].text_content().strip()
+                name = self._first_div(actedwith_div)[0].text_content().strip()
+                self._add_user(listing, link.get("href"), self._first_image(link)[0].get("src"), name, sign)
+            yield listing, item_span.get("id")
+
+
+def get_default_market_history_parser() -> MarketHistoryParser:
+    """ The lxml backend when lxml is installed, the BeautifulSoup one otherwise """
+    if lxml is not None:
+        return LxmlMarketHistoryParser()
+    return BeautifulSoupMarketHistoryParser()
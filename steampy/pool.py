@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable
+
+from requests.adapters import HTTPAdapter
+
+from .client import SteamClient
+from .rate_limit import AdaptiveRateLimiter
+
+
+class _Account:
+    def __init__(self, client: SteamClient) -> None:
+        self.client = client
+        self.tasks = deque()
+        self.running = False
+
+
+class SteamClientPool:
+    """
+    Many SteamClients driven by one process.
+    Every session sends its requests through the same HTTPAdapter, so the connections to the Steam hosts are shared
+    and bounded by 'pool_maxsize' per host instead of being opened by each account.
+    Operations submitted for an account run on a pool of 'max_workers' threads, one at a time per account and in the
+    order they were submitted. A shared 'rate_limiter' makes all the accounts respect the same request rates.
+    """
+
+    def __init__(self, max_workers: int = 16, pool_connections: int = 10, pool_maxsize: int = 32,
+                 rate_limiter: AdaptiveRateLimiter = None) -> None:
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+        self.rate_limiter = rate_limiter
+        self.accounts = {}  # type: Dict[str, _Account]
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._busy_time = 0.0
+        self._closing = False
+
+    def add(self, name: str, client: SteamClient = None, api_key: str = None) -> SteamClient:
+        """ Register an account under 'name', a new SteamClient is created when 'client' is not given """
+        client = client if client is not None else SteamClient(api_key)
+        client.steam_session.mount('https://', self.adapter)
+        client.steam_session.mount('http://', self.adapter)
+        if self.rate_limiter is not None:
+            client.steam_session.rate_limiter = self.rate_limiter
+        with self._lock:
+            self.accounts[name] = _Account(client)
+        return client
+
+    def remove(self, name: str) -> SteamClient:
+        with self._lock:
+            return self.accounts.pop(name).client
+
+    def get(self, name: str) -> SteamClient:
+        return self.accounts[name].client
+
+    def submit(self, name: str, function: Callable, *args, **kwargs) -> Future:
+        """ Run 'function(client, *args, **kwargs)' for the account once its previous operations are done """
+        future = Future()
+        with self._lock:
+            if self._closing:
+                raise RuntimeError('Cannot submit to a closed SteamClientPool')
+            account = self.accounts[name]
+            account.tasks.append((future, function, args, kwargs))
+            self._submitted += 1
+            if not account.running:
+                account.running = True
+                self._executor.submit(self._run_next, account)
+        return future
+
+    def map(self, function: Callable, names: Iterable[str] = None) -> Dict[str, Future]:
+        """ Submit 'function(client)' for every account in 'names' (all by default), return {name: future} """
+        names = list(self.accounts) if names is None else names
+        return {name: self.submit(name, function) for name in names}
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {'accounts': len(self.accounts),
+                    'busy_accounts': sum(1 for account in self.accounts.values() if account.running),
+                    'submitted': self._submitted,
+                    'completed': self._completed,
+                    'failed': self._failed,
+                    'pending': sum(len(account.tasks) for account in self.accounts.values()),
+                    'busy_time': self._busy_time,
+                    'connection_pools': len(self.adapter.poolmanager.pools)}
+
+    def close(self) -> None:
+        """ Run the operations already submitted, then release the threads and the connections """
+        with self._lock:
+            self._closing = True
+        self._executor.shutdown(wait=True)
+        self.adapter.close()
+
+    def __enter__(self) -> 'SteamClientPool':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _run_next(self, account: _Account) -> None:
+        while True:
+            with self._lock:
+                future, function, args, kwargs = account.tasks.popleft()
+            self._run_task(account, future, function, args, kwargs)
+            with self._lock:
+                if not account.tasks:
+                    account.running = False
+                    return
+                if not self._closing:
+                    # resubmitting instead of looping lets the other accounts use the worker between two operations
+                    self._executor.submit(self._run_next, account)
+                    return
+            # once closing the executor takes no new work: the remaining operations run on this worker
+
+    def _run_task(self, account: _Account, future: Future, function: Callable, args: tuple, kwargs: dict) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        start = time.monotonic()
+        try:
+            result = function(account.client, *args, **kwargs)
+        except Exception as e:
+            future.set_exception(e)
+            failed = 1
+        else:
+            future.set_result(result)
+            failed = 0
+        with self._lock:
+            self._completed += 1 - failed
+            self._failed += failed
+            self._busy_time += time.monotonic() - start
@@ -0,0 +1,131 @@
+import random
+import threading
+import time
+
+
+ENDPOINT_FAMILIES = [
+    ('priceoverview', '/market/priceoverview'),
+    ('ieconservice', '/IEconService/'),
+    ('mobileconf', '/mobileconf/'),
+    ('inventory', '/inventory/'),
+    ('tradeoffer', '/tradeoffer/'),
+]
+
+
+def get_endpoint_family(url: str) -> str:
+    for family, fragment in ENDPOINT_FAMILIES:
+        if fragment in url:
+            return family
+    return 'default'
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at 'rate' tokens per second up to 'capacity'.
+    The rate is adapted between 'min_rate' and 'max_rate' with AIMD.
+    """
+
+    def __init__(self, rate: float, capacity: float, min_rate: float = None, max_rate: float = None) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.max_rate = max_rate if max_rate is not None else rate * 2
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """ Take one token and return how many seconds the caller has to wait before using it """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def increase(self, step: float) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + step)
+
+    def decrease(self, factor: float) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * factor)
+            self._tokens = min(self._tokens, 0)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+
+class AdaptiveRateLimiter:
+    """
+    Keeps one TokenBucket per endpoint family (see get_endpoint_family).
+    Every 429 divides the family rate by 'decrease_factor', every other response adds 'increase_ratio' of the
+    initial rate back. Requests of families without a bucket are not limited.
+    """
+
+    # family: (requests per second, burst)
+    DEFAULT_RATES = {
+        'priceoverview': (20 / 60, 20),
+        'ieconservice': (10, 20),
+        'mobileconf': (5, 10),
+        'inventory': (0.5, 5),
+        'tradeoffer': (1, 5),
+    }
+
+    def __init__(self, rates: dict = None, decrease_factor: float = 0.5, increase_ratio: float = 0.05,
+                 max_retries: int = 3, backoff_base: float = 1.0, backoff_cap: float = 60.0) -> None:
+        rates = rates if rates is not None else self.DEFAULT_RATES
+        self.buckets = {family: TokenBucket(rate, burst) for family, (rate, burst) in rates.items()}
+        self._increase_steps = {family: rate * increase_ratio for family, (rate, _) in rates.items()}
+        self.increase_ratio = increase_ratio
+        self.decrease_factor = decrease_factor
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    @property
+    def rates(self) -> dict:
+        """ Current requests per second of every limited endpoint family """
+        return {family: bucket.rate for family, bucket in self.buckets.items()}
+
+    def set_rate(self, family: str, rate: float, burst: float = None) -> None:
+        bucket = self.buckets.get(family)
+        if bucket is None:
+            self.buckets[family] = TokenBucket(rate, burst or 1)
+        else:
+            bucket.rate = rate
+            bucket.max_rate = max(bucket.max_rate, rate)
+            if burst is not None:
+                bucket.capacity = burst
+        self._increase_steps[family] = rate * self.increase_ratio
+
+    def reserve(self, url: str) -> float:
+        bucket = self.buckets.get(get_endpoint_family(url))
+        if bucket is None:
+            return 0.0
+        return bucket.reserve()
+
+    def on_response(self, url: str, status_code: int) -> None:
+        family = get_endpoint_family(url)
+        bucket = self.buckets.get(family)
+        if bucket is None:
+            return
+        if status_code == 429:
+            bucket.decrease(self.decrease_factor)
+        else:
+            bucket.increase(self._increase_steps[family])
+
+    def backoff(self, attempt: int, retry_after: str = None) -> float:
+        """ Seconds to sleep before retry number 'attempt' (full jitter), 'Retry-After' wins if present """
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
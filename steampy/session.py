@@ -1,9 +1,15 @@
+import time
+
 import requests
+from requests.adapters import BaseAdapter
 
+from .cache import LRUCache
 from .constants import API_URL
 from .utils import handle_steam_response, extract_json
-from .guard import load_steam_guard
+from .guard import load_steam_guard, GuardKeyring
 from .login import LoginExecutor
+from .metrics import get_instrumentation, get_endpoint
+from .rate_limit import AdaptiveRateLimiter
 
 from .exceptions import SteamServerError, LoginRequired, InvalidCredentials, LoginException
 
@@ -19,27 +25,71 @@ def login_required(func):
 
 
 class SteamSession(requests.Session):
-    def __init__(self):
+    def __init__(self, rate_limiter: AdaptiveRateLimiter = None, transport: BaseAdapter = None):
+        """
+        Pass your own 'rate_limiter' to tune or share the per endpoint rates.
+        'transport' replaces the http adapter, e.g. a RecordingAdapter or a ReplayAdapter (see steampy.transport).
+        """
         super().__init__()
         self._login_executor = None  # type: LoginExecutor
 
         self.steam_guard = {}
+        self.guard_keyring = None  # type: GuardKeyring
         self.steam_id = None  # type: str
         self.api_key = None  # type: str
+        self.confirmation_cache = LRUCache()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else AdaptiveRateLimiter()
+        if transport is not None:
+            self.set_transport(transport)
+
+    def set_transport(self, transport: BaseAdapter) -> None:
+        """ Send every http and https request through 'transport' """
+        self.mount('https://', transport)
+        self.mount('http://', transport)
 
     def login(self, username: str, password: str, steam_guard: str) -> None:
         self.steam_guard = load_steam_guard(steam_guard)
-        self._login_executor = LoginExecutor(username, password, self.steam_guard['shared_secret'], self)
+        self.guard_keyring = GuardKeyring.from_steam_guard(self.steam_guard)
+        self._login_executor = LoginExecutor(username, password, self.steam_guard['shared_secret'], self,
+                                             self.guard_keyring)
         self._login()
 
-    @login_required
     def relogin(self):
+        if not self._login_executor:
+            raise LoginRequired('Use login method first')
+        if self._login_executor.password is None:
+            raise LoginRequired('Session was imported without password, use login method to login again')
         self._login()
 
+    def export_state(self) -> dict:
+        """ Everything needed to resume this session without login, except the password. It is json serializable """
+        cookies = [{'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain, 'path': cookie.path,
+                    'secure': cookie.secure, 'expires': cookie.expires} for cookie in self.cookies]
+        return {'cookies': cookies,
+                'steam_id': self.steam_id,
+                'steam_guard': self.steam_guard,
+                'time_offset': self.guard_keyring.time_offset if self.guard_keyring else 0,
+                'username': self._login_executor.username if self._login_executor else None}
+
+    def import_state(self, state: dict, password: str = None) -> None:
+        """ Resume a session from 'export_state', 'password' is only needed by 'relogin' """
+        for cookie in state['cookies']:
+            self.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'],
+                             secure=cookie['secure'], expires=cookie['expires'])
+        self.steam_id = state['steam_id']
+        self.steam_guard = state['steam_guard']
+        self.guard_keyring = GuardKeyring.from_steam_guard(self.steam_guard, self.steam_guard.get('steamid') or
+                                                           self.steam_id)
+        self.guard_keyring.time_offset = state.get('time_offset', 0)
+        self._login_executor = LoginExecutor(state['username'], password, self.steam_guard.get('shared_secret'), self,
+                                             self.guard_keyring)
+
     def _login(self) -> None:
         try:
             login_response_dict = self._login_executor.login()
             self.steam_id = login_response_dict["steamid"]
+            if self.guard_keyring.steam_id is None:
+                self.guard_keyring.steam_id = self.steam_id
         except InvalidCredentials as e:
             raise e
         except Exception as e:
@@ -67,6 +117,39 @@ class SteamSession(requests.Session):
         response_json = extract_json(response)
         return response_json
 
+    def request(self, method, url, *args, **kwargs) -> requests.Response:
+        """ Throttle the request with 'rate_limiter' and retry it on 429 with jittered backoff """
+        if self.rate_limiter is None:
+            return self._send_request(method, url, *args, **kwargs)
+        attempt = 0
+        while True:
+            delay = self.rate_limiter.reserve(url)
+            if delay:
+                time.sleep(delay)
+            response = self._send_request(method, url, *args, **kwargs)
+            self.rate_limiter.on_response(url, response.status_code)
+            if response.status_code != 429 or attempt >= self.rate_limiter.max_retries:
+                return response
+            time.sleep(self.rate_limiter.backoff(attempt, response.headers.get('Retry-After')))
+            attempt += 1
+
+    def _send_request(self, method, url, *args, **kwargs) -> requests.Response:
+        """ One attempt of 'request', reported to the installed instrumentation (see steampy.metrics) """
+        instrumentation = get_instrumentation()
+        if not instrumentation.enabled:
+            return super().request(method, url, *args, **kwargs)
+        endpoint = get_endpoint(url)
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.exceptions.RequestException as e:
+            instrumentation.on_error(method, endpoint, time.perf_counter() - start, e)
+            raise
+        bytes_received = len(response.content) if not kwargs.get('stream') else 0
+        instrumentation.on_response(method, endpoint, response.status_code, time.perf_counter() - start,
+                                    len(response.request.body or b''), bytes_received)
+        return response
+
     def post(self, url, data=None, json=None, **kwargs) -> requests.Response:
         """ Same of requests.post(...) """
         try:
@@ -0,0 +1,241 @@
+import bisect
+import hashlib
+import http.client
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+MAGIC = b'STEAMPY-CASSETTE-1\n'
+INDEX_MAGIC = b'CASSIDX1'
+# digest of the request key, status code, elapsed seconds, meta length, compressed body length
+RECORD = struct.Struct('>16sHfII')
+# digest of the request key, offset of the record
+INDEX_ENTRY = struct.Struct('>16sQ')
+# offset of the index, number of entries, INDEX_MAGIC
+TRAILER = struct.Struct('>QI8s')
+
+# parameters changing on every call (timestamps, signatures, credentials) are not part of the request key
+IGNORED_PARAMS = frozenset(['donotcache', 't', 'k', 'sessionid', 'key', 'password', 'rsatimestamp', 'twofactorcode',
+                            'captcha', 'json_tradeoffer', 'tradeoffermessage', 'trade_offer_create_params',
+                            'token_secure', 'auth', 'webcookie', '_'])
+
+# headers describing the raw body, the cassette stores it decoded
+RAW_BODY_HEADERS = frozenset(['content-encoding', 'content-length', 'transfer-encoding'])
+
+
+def create_request_key(method: str, url: str, body=None, ignored_params: frozenset = IGNORED_PARAMS) -> str:
+    """ 'METHOD host/path?params' with the query and form parameters sorted, the volatile ones removed """
+    parts = urlsplit(url)
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    if body:
+        if isinstance(body, bytes):
+            body = body.decode('utf-8', errors='replace')
+        if isinstance(body, str):
+            params += parse_qsl(body, keep_blank_values=True)
+    params = sorted((name, value) for name, value in params if name not in ignored_params)
+    return '%s %s%s?%s' % (method, parts.netloc, parts.path, urlencode(params))
+
+
+def get_digest(key: str) -> bytes:
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    Sends the requests to Steam and appends every request / response pair to the cassette at 'path'.
+    Call 'close' (or SteamSession.close) to write the index; a cassette without index is still readable, only
+    slower to open. Cassettes hold the cookies set by Steam: keep them private.
+    """
+
+    def __init__(self, path: str, ignored_params: frozenset = IGNORED_PARAMS, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.path = path
+        self.ignored_params = ignored_params
+        self._index = []
+        self._lock = threading.Lock()
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+
+    def send(self, request, **kwargs) -> requests.Response:
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        body = response.content
+        elapsed = time.perf_counter() - started
+        key = create_request_key(request.method, request.url, request.body, self.ignored_params)
+        headers = [(name, value) for name, value in self._get_raw_headers(response)
+                   if name.lower() not in RAW_BODY_HEADERS]
+        meta = json.dumps({'key': key, 'headers': headers}).encode('utf-8')
+        compressed_body = zlib.compress(body)
+        digest = get_digest(key)
+        with self._lock:
+            if self._file.closed:
+                return response
+            offset = self._file.tell()
+            self._file.write(RECORD.pack(digest, response.status_code, elapsed, len(meta), len(compressed_body)))
+            self._file.write(meta)
+            self._file.write(compressed_body)
+            self._file.flush()
+            self._index.append((digest, offset))
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                index_offset = self._file.tell()
+                for digest, offset in sorted(self._index):
+                    self._file.write(INDEX_ENTRY.pack(digest, offset))
+                self._file.write(TRAILER.pack(index_offset, len(self._index), INDEX_MAGIC))
+                self._file.close()
+        super().close()
+
+    @staticmethod
+    def _get_raw_headers(response: requests.Response) -> list:
+        # the urllib3 headers keep repeated headers such as Set-Cookie apart
+        raw_headers = getattr(response.raw, 'headers', None)
+        return list(raw_headers.items()) if raw_headers is not None else list(response.headers.items())
+
+    def __getstate__(self):
+        return {'path': self.path, 'ignored_params': self.ignored_params}
+
+    def __setstate__(self, state):
+        # a session restored from a pickle keeps recording in a new cassette next to the old one
+        self.__init__(state['path'] + '.' + str(os.getpid()), state['ignored_params'])
+
+
+class _RecordedHeaders:
+    """ What requests reads from urllib3 responses to extract cookies """
+
+    def __init__(self, headers: list) -> None:
+        self.msg = http.client.HTTPMessage()
+        for name, value in headers:
+            self.msg[name] = value
+        self._original_response = self
+
+
+class _IndexDigests:
+    """ Sequence of the digests of the index, read from the memory map """
+
+    def __init__(self, cassette: mmap.mmap, offset: int, count: int) -> None:
+        self._cassette = cassette
+        self._offset = offset
+        self._count = count
+
+    def __getitem__(self, position: int) -> bytes:
+        start = self._offset + position * INDEX_ENTRY.size
+        return self._cassette[start:start + 16]
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Answers the requests from a cassette written by RecordingAdapter, without network.
+    The cassette is memory-mapped and looked up through its sorted index, so one cassette can be shared by many
+    sessions and threads. Requests recorded several times get their responses in the recorded order, then cycle.
+    With 'speed' set every response waits for its recorded duration divided by 'speed', otherwise it is immediate.
+    A request missing from the cassette raises requests.exceptions.ConnectionError.
+    """
+
+    def __init__(self, path: str, speed: float = None, ignored_params: frozenset = IGNORED_PARAMS) -> None:
+        super().__init__()
+        self.path = path
+        self.speed = speed
+        self.ignored_params = ignored_params
+        self.hits = 0
+        self.misses = 0
+        self._replayed = {}
+        self._lock = threading.Lock()
+        with open(path, 'rb') as f:
+            self._cassette = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._cassette[:len(MAGIC)] != MAGIC:
+            raise ValueError('%s is not a steampy cassette' % path)
+        self._load_index()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None) -> requests.Response:
+        key = create_request_key(request.method, request.url, request.body, self.ignored_params)
+        offset = self._next_offset(get_digest(key))
+        if offset is None:
+            raise requests.exceptions.ConnectionError('No recorded response for %s' % key, request=request)
+        _, status_code, elapsed, meta_length, body_length = RECORD.unpack_from(self._cassette, offset)
+        meta_start = offset + RECORD.size
+        meta = json.loads(self._cassette[meta_start:meta_start + meta_length].decode('utf-8'))
+        body_start = meta_start + meta_length
+        body = zlib.decompress(self._cassette[body_start:body_start + body_length])
+        if self.speed:
+            time.sleep(elapsed / self.speed)
+        return self._build_response(request, status_code, meta['headers'], body)
+
+    def close(self) -> None:
+        if not self._cassette.closed:
+            self._cassette.close()
+
+    def _load_index(self) -> None:
+        index_offset, count, magic = TRAILER.unpack_from(self._cassette, len(self._cassette) - TRAILER.size)
+        if magic == INDEX_MAGIC:
+            self._index_offset = index_offset
+            self._digests = _IndexDigests(self._cassette, index_offset, count)
+            self._offsets = None
+            return
+        # recording was interrupted before the index was written: scan the records
+        entries = []
+        offset = len(MAGIC)
+        while offset + RECORD.size <= len(self._cassette):
+            digest, _, _, meta_length, body_length = RECORD.unpack_from(self._cassette, offset)
+            end = offset + RECORD.size + meta_length + body_length
+            if end > len(self._cassette):  # last record only partially written
+                break
+            entries.append((digest, offset))
+            offset = end
+        entries.sort()
+        self._digests = [digest for digest, _ in entries]
+        self._offsets = [offset for _, offset in entries]
+
+    def _get_offset(self, position: int) -> int:
+        if self._offsets is not None:
+            return self._offsets[position]
+        return INDEX_ENTRY.unpack_from(self._cassette, self._index_offset + position * INDEX_ENTRY.size)[1]
+
+    def _next_offset(self, digest: bytes) -> int:
+        start = bisect.bisect_left(self._digests, digest)
+        end = bisect.bisect_right(self._digests, digest, start)
+        with self._lock:
+            if start == end:
+                self.misses += 1
+                return None
+            self.hits += 1
+            replayed = self._replayed.get(digest, 0)
+            self._replayed[digest] = replayed + 1
+        return self._get_offset(start + replayed % (end - start))
+
+    @staticmethod
+    def _build_response(request, status_code: int, headers: list, body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict()
+        for name, value in headers:
+            response.headers[name] = value if name not in response.headers else \
+                response.headers[name] + ', ' + value
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _RecordedHeaders(headers)
+        response.reason = http.client.responses.get(status_code, '')
+        response.url = request.url
+        response.request = request
+        response._content = body
+        return response
+
+    def __getstate__(self):
+        return {'path': self.path, 'speed': self.speed, 'ignored_params': self.ignored_params}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['speed'], state['ignored_params'])
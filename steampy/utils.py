@@ -8,7 +8,8 @@ import requests
 from bs4 import BeautifulSoup, Tag
 
 from steampy.exceptions import TooManyRequests, SteamServerError
-from steampy.models import GameOptions
+from steampy.metrics import instrumented_parser
+from steampy.models import GameOptions, DescriptionRegistry, ItemView
 
 
 def text_between(text: str, begin: str, end: str) -> str:
@@ -49,44 +50,94 @@ def price_to_float(price: str) -> float:
     return float(price[1:].split()[0])
 
 
-def merge_items_with_descriptions_from_inventory(inventory_response: dict, game: GameOptions) -> dict:
+PRICE_SEPARATORS = re.compile('[.,]')
+PRICE_NOT_NUMBER = re.compile('[^\\d.,]')
+NOT_DIGIT = re.compile('\\D')
+
+
+def parse_price(price: str) -> float:
+    """ Parse a Steam formatted price of any currency: '$1,234.56 USD', '1 234,56 pуб.', '12,34€'... """
+    number = PRICE_NOT_NUMBER.sub('', price).strip('.,')
+    if not number:
+        raise ValueError('No number in price %r' % price)
+    decimal_separator = max(number.rfind('.'), number.rfind(','))
+    if decimal_separator != -1 and len(number) - decimal_separator - 1 in (1, 2):
+        integer, decimals = number[:decimal_separator], number[decimal_separator + 1:]
+    else:
+        integer, decimals = number, '0'
+    return float(PRICE_SEPARATORS.sub('', integer) + '.' + decimals)
+
+
+def parse_price_overviews(price_overviews: List[dict]) -> List[dict]:
+    """
+    Add 'lowest_price_value', 'median_price_value' (floats) and 'volume_value' (int) to 'fetch_price' responses.
+    Missing or unparsable fields are set to None.
+    """
+    for price_overview in price_overviews:
+        for field in ('lowest_price', 'median_price'):
+            try:
+                price_overview[field + '_value'] = parse_price(price_overview[field])
+            except (KeyError, TypeError, ValueError):
+                price_overview[field + '_value'] = None
+        try:
+            price_overview['volume_value'] = int(NOT_DIGIT.sub('', price_overview['volume']))
+        except (KeyError, TypeError, ValueError):
+            price_overview['volume_value'] = None
+    return price_overviews
+
+
+def merge_items_with_descriptions_from_inventory(inventory_response: dict, game: GameOptions,
+                                                 registry: DescriptionRegistry = None) -> dict:
     inventory = inventory_response['rgInventory']
     descriptions = inventory_response['rgDescriptions']
-    return merge_items(inventory.values(), descriptions, context_id=game.context_id)
+    return merge_items(inventory.values(), descriptions, context_id=game.context_id, registry=registry)
 
 
-def merge_items_with_descriptions_from_offers(offers_response: dict) -> dict:
+def merge_items_with_descriptions_from_offers(offers_response: dict, registry: DescriptionRegistry = None) -> dict:
     descriptions = {get_description_key(offer): offer for offer in offers_response['response'].get('descriptions', [])}
     received_offers = offers_response['response'].get('trade_offers_received', [])
     sent_offers = offers_response['response'].get('trade_offers_sent', [])
     offers_response['response']['trade_offers_received'] = list(
-        map(lambda offer: merge_items_with_descriptions_from_offer(offer, descriptions), received_offers))
+        map(lambda offer: merge_items_with_descriptions_from_offer(offer, descriptions, registry), received_offers))
     offers_response['response']['trade_offers_sent'] = list(
-        map(lambda offer: merge_items_with_descriptions_from_offer(offer, descriptions), sent_offers))
+        map(lambda offer: merge_items_with_descriptions_from_offer(offer, descriptions, registry), sent_offers))
     return offers_response
 
 
-def merge_items_with_descriptions_from_offer(offer: dict, descriptions: dict) -> dict:
-    merged_items_to_give = merge_items(offer.get('items_to_give', []), descriptions)
-    merged_items_to_receive = merge_items(offer.get('items_to_receive', []), descriptions)
+def merge_items_with_descriptions_from_offer(offer: dict, descriptions: dict,
+                                             registry: DescriptionRegistry = None) -> dict:
+    merged_items_to_give = merge_items(offer.get('items_to_give', []), descriptions, registry=registry)
+    merged_items_to_receive = merge_items(offer.get('items_to_receive', []), descriptions, registry=registry)
     offer['items_to_give'] = merged_items_to_give
     offer['items_to_receive'] = merged_items_to_receive
     return offer
 
 
 def merge_items(items: List[dict], descriptions: dict, **kwargs) -> dict:
+    """
+    Return {item id: description merged with the item}.
+    With a 'registry' keyword the items are ItemViews over shared descriptions instead of description copies.
+    """
     merged_items = {}
     for item in items:
-        description_key = get_description_key(item)
-        description = copy.copy(descriptions[description_key])
-        item_id = item.get('id') or item['assetid']
-        description['contextid'] = item.get('contextid') or kwargs['context_id']
-        description['id'] = item_id
-        description['amount'] = item['amount']
-        merged_items[item_id] = description
+        merged_item = merge_item(item, descriptions, **kwargs)
+        merged_items[merged_item['id']] = merged_item
     return merged_items
 
 
+def merge_item(item: dict, descriptions: dict, registry: DescriptionRegistry = None, **kwargs) -> dict:
+    description_key = get_description_key(item)
+    contextid = item.get('contextid') or kwargs['context_id']
+    item_id = item.get('id') or item['assetid']
+    if registry is not None:
+        return ItemView(registry.intern(descriptions[description_key]), contextid, item_id, item['amount'])
+    description = copy.copy(descriptions[description_key])
+    description['contextid'] = contextid
+    description['id'] = item_id
+    description['amount'] = item['amount']
+    return description
+
+
 def get_description_key(item: dict) -> str:
     return item['classid'] + '_' + item['instanceid']
 
@@ -108,6 +159,7 @@ def handle_steam_response(response: requests.Response):
         raise SteamServerError("Steam responded with a %s http code" % response.status_code)
 
 
+@instrumented_parser('json')
 def extract_json(response: requests.Response) -> dict:
     try:
         return response.json()
@@ -0,0 +1,99 @@
+import logging
+import threading
+import time
+from typing import Callable, List, Tuple
+
+from .models import TradeOfferState
+
+logger = logging.getLogger(__name__)
+
+
+class OfferWatcher:
+    """
+    Reports trade offer changes without downloading every active offer on each poll.
+    'poll' first asks for the cheap GetTradeOffersSummary and only when it changed fetches the active offers and the
+    ones modified since the last change seen ('time_historical_cutoff'). The state of every offer is kept to detect
+    transitions: 'on_new(offer)' fires for received offers seen for the first time while active, 'on_accepted(offer)',
+    'on_declined(offer)' and 'on_countered(offer)' when an offer reaches that state and
+    'on_state_changed(offer, old_state, new_state)' for every transition.
+    """
+
+    def __init__(self, steam_client, on_new: Callable = None, on_accepted: Callable = None,
+                 on_declined: Callable = None, on_countered: Callable = None, on_state_changed: Callable = None,
+                 get_descriptions: bool = True, cutoff_margin: int = 60) -> None:
+        self.steam_client = steam_client
+        self.on_new = on_new
+        self.on_accepted = on_accepted
+        self.on_declined = on_declined
+        self.on_countered = on_countered
+        self.on_state_changed = on_state_changed
+        self.get_descriptions = get_descriptions
+        self.cutoff_margin = cutoff_margin
+        self.states = {}
+        self.last_modified = int(time.time())
+        self.last_summary = None
+        self.requests = 0
+        self._stop_event = threading.Event()
+
+    def poll(self, force: bool = False) -> List[Tuple[dict, TradeOfferState, TradeOfferState]]:
+        """ Fire the callbacks and return (offer, old state or None, new state) of the offers that changed """
+        summary = self.steam_client.get_trade_offers_summary().get('response', {})
+        self.requests += 1
+        if summary == self.last_summary and not force:
+            return []
+        cutoff = max(self.last_modified - self.cutoff_margin, 0)
+        response = self.steam_client.get_trade_offers(get_descriptions=self.get_descriptions, active_only=True,
+                                                      time_historical_cutoff=cutoff).get('response', {})
+        self.requests += 1
+        self.last_summary = summary
+        changes = []
+        for offer in response.get('trade_offers_received', []) + response.get('trade_offers_sent', []):
+            old_state = self.states.get(offer['tradeofferid'])
+            new_state = TradeOfferState(offer['trade_offer_state'])
+            self.last_modified = max(self.last_modified, offer.get('time_updated', 0))
+            if old_state == new_state:
+                continue
+            self.states[offer['tradeofferid']] = new_state
+            changes.append((offer, old_state, new_state))
+            self._notify(offer, old_state, new_state)
+        self._forget_missing_offers(response)
+        return changes
+
+    def run(self, interval: float = 10, max_backoff: float = 300) -> None:
+        """
+        Poll every 'interval' seconds until 'stop' is called.
+        A failed poll is logged and the next one waits twice as long as the previous, up to 'max_backoff' seconds.
+        """
+        self._stop_event.clear()
+        errors = 0
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+                errors = 0
+            except Exception:
+                logger.exception('Polling trade offers failed')
+                errors += 1
+            self._stop_event.wait(min(interval * 2 ** errors, max_backoff) if errors else interval)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _notify(self, offer: dict, old_state: TradeOfferState, new_state: TradeOfferState) -> None:
+        if self.on_state_changed is not None:
+            self.on_state_changed(offer, old_state, new_state)
+        if old_state is None and new_state == TradeOfferState.Active and not offer.get('is_our_offer'):
+            callback = self.on_new
+        else:
+            callback = {TradeOfferState.Accepted: self.on_accepted,
+                        TradeOfferState.Declined: self.on_declined,
+                        TradeOfferState.Countered: self.on_countered}.get(new_state)
+        if callback is not None:
+            callback(offer)
+
+    def _forget_missing_offers(self, response: dict) -> None:
+        # the response holds every active offer and the ones modified since the cutoff, the others will not be
+        # returned again: finished offers older than the cutoff, expired or cancelled ones we missed
+        returned = {offer['tradeofferid'] for offer in
+                    response.get('trade_offers_received', []) + response.get('trade_offers_sent', [])}
+        for offer_id in self.states.keys() - returned:
+            del self.states[offer_id]
@@ -0,0 +1,137 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from steampy.cache import FetchCache, SingleFlight, SqliteCache
+
+
+class TestSingleFlight(TestCase):
+
+    def test_concurrent_calls_share_one_run(self):
+        single_flight = SingleFlight()
+        barrier = threading.Barrier(8)
+        calls = []
+        results = []
+
+        def function():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        def worker():
+            barrier.wait()
+            results.append(single_flight.do('key', function))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 8)
+
+    def test_error_is_raised_to_every_caller(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        errors = []
+
+        def function():
+            started.set()
+            time.sleep(0.1)
+            raise ValueError('failed')
+
+        def worker():
+            try:
+                single_flight.do('key', function)
+            except ValueError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=worker)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=worker)
+        follower.start()
+        leader.join()
+        follower.join()
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(single_flight.do('key', lambda: 'retried'), 'retried')
+
+
+class TestFetchCache(TestCase):
+
+    def test_one_fetch_per_key_under_contention(self):
+        cache = FetchCache(ttl=60)
+        barrier = threading.Barrier(16)
+        fetches = {'a': 0, 'b': 0}
+        lock = threading.Lock()
+        results = []
+
+        def fetch(key):
+            with lock:
+                fetches[key] += 1
+            time.sleep(0.05)
+            return {'key': key}
+
+        def worker(key):
+            barrier.wait()
+            results.append(cache.get_or_fetch(key, lambda: fetch(key)))
+
+        threads = [threading.Thread(target=worker, args=('a' if i % 2 else 'b',)) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(fetches, {'a': 1, 'b': 1})
+        self.assertEqual(sorted(result['key'] for result in results), ['a'] * 8 + ['b'] * 8)
+        self.assertEqual(cache.hits + cache.misses, 16)
+
+    def test_hits_and_misses(self):
+        cache = FetchCache(ttl=60)
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.get_or_fetch('key', lambda: {'value': 1}), {'value': 1})
+        self.assertEqual(cache.get_or_fetch('key', lambda: {'value': 2}), {'value': 1})
+        self.assertEqual(cache.get('key'), {'value': 1})
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_returned_values_are_copies(self):
+        cache = FetchCache(ttl=60)
+        cache.get_or_fetch('key', lambda: {'value': 1})['value'] = 2
+        self.assertEqual(cache.get('key'), {'value': 1})
+
+    def test_entries_expire(self):
+        cache = FetchCache(ttl=0.05)
+        cache.set('key', {'value': 1})
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.get_or_fetch('key', lambda: {'value': 2}), {'value': 2})
+
+
+class TestSqliteCache(TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_entries_are_shared_between_connections(self):
+        cache = SqliteCache(self.path)
+        cache.set('key', {'value': 1})
+        other = SqliteCache(self.path)
+        self.assertEqual(other.get('key'), {'value': 1})
+        self.assertIn('key', other)
+        cache.close()
+        other.close()
+
+    def test_ttl(self):
+        cache = SqliteCache(self.path)
+        cache.set('key', 1, ttl=0.05)
+        cache.set('other', 2)
+        self.assertEqual(cache.get('key'), 1)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.get_entry('other'), (2, None))
+        cache.close()
@@ -0,0 +1,96 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from steampy.exceptions import SteamServerError
+from steampy.history import SqliteMarketHistoryStore
+from steampy.market import SteamMarket
+from steampy.session import SteamSession
+
+
+class FakeHistoryMarket(SteamMarket):
+    """ Serves a market history of 'count' events, 'fail_after' pages can be served before a SteamServerError """
+
+    def __init__(self, count: int) -> None:
+        steam_session = SteamSession(rate_limiter=None)
+        steam_session._login_executor = object()
+        super().__init__(steam_session)
+        self.events = []
+        self.add_events(count)
+        self.requests = []
+        self.fail_after = None
+
+    def add_events(self, count: int) -> None:
+        first = len(self.events) + 1
+        self.events.extend('listing%s' % position for position in range(first, first + count))
+
+    def get_market_history(self, count=30, start=0) -> dict:
+        if self.fail_after is not None and len(self.requests) >= self.fail_after:
+            raise SteamServerError()
+        self.requests.append(start)
+        newest_first = self.events[::-1]
+        listings = [{'listing_id': listing_id} for listing_id in newest_first[start:start + count]]
+        return {'total_count': len(self.events), 'pagesize': count, 'listings': listings, 'start': start}
+
+
+class TestSyncMarketHistory(TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        self.store = SqliteMarketHistoryStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        os.remove(self.path)
+
+    def assertStoreMatches(self, market: FakeHistoryMarket):
+        self.assertEqual([listing['listing_id'] for listing in self.store.listings(newest_first=False)],
+                         market.events)
+        self.assertEqual(self.store.checkpoint, {'total_count': len(market.events), 'start': None})
+
+    def test_first_sync(self):
+        market = FakeHistoryMarket(250)
+        self.assertEqual(market.sync_market_history(self.store, page_size=100), 250)
+        self.assertEqual(market.requests, [0, 100, 200])
+        self.assertStoreMatches(market)
+
+    def test_up_to_date_store_costs_one_request(self):
+        market = FakeHistoryMarket(250)
+        market.sync_market_history(self.store, page_size=100)
+        market.requests = []
+        market.add_events(3)
+        self.assertEqual(market.sync_market_history(self.store, page_size=100), 3)
+        self.assertEqual(market.requests, [0])
+        self.assertStoreMatches(market)
+
+    def test_interrupted_sync_is_resumed_from_checkpoint(self):
+        market = FakeHistoryMarket(450)
+        market.fail_after = 2
+        with self.assertRaises(SteamServerError):
+            market.sync_market_history(self.store, page_size=100)
+        self.assertEqual(len(self.store), 200)
+        self.assertEqual(self.store.checkpoint, {'total_count': 450, 'start': 200})
+
+        # events added in between shift the pages, the resume skips the ones already stored
+        market.add_events(30)
+        market.fail_after = None
+        market.requests = []
+        self.assertEqual(market.sync_market_history(self.store, page_size=100), 280)
+        self.assertEqual(market.requests, [0, 230, 330, 430])
+        self.assertStoreMatches(market)
+
+    def test_resume_interrupted_again(self):
+        market = FakeHistoryMarket(450)
+        market.fail_after = 1
+        with self.assertRaises(SteamServerError):
+            market.sync_market_history(self.store, page_size=100)
+        market.add_events(10)
+        market.requests = []
+        market.fail_after = 2
+        with self.assertRaises(SteamServerError):
+            market.sync_market_history(self.store, page_size=100)
+        self.assertEqual(self.store.checkpoint, {'total_count': 460, 'start': 210})
+        market.fail_after = None
+        market.sync_market_history(self.store, page_size=100)
+        self.assertStoreMatches(market)
@@ -0,0 +1,81 @@
+import pickle
+from unittest import TestCase
+
+from steampy.rate_limit import AdaptiveRateLimiter, TokenBucket, get_endpoint_family
+
+PRICE_URL = 'https://steamcommunity.com/market/priceoverview/?appid=730'
+INVENTORY_URL = 'https://steamcommunity.com/inventory/76561198000000000/730/2'
+
+
+class TestTokenBucket(TestCase):
+
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=1, capacity=3)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(bucket.reserve(), 1, delta=0.01)
+        self.assertAlmostEqual(bucket.reserve(), 2, delta=0.01)
+
+    def test_additive_increase_up_to_max_rate(self):
+        bucket = TokenBucket(rate=1, capacity=1, max_rate=1.5)
+        bucket.increase(0.25)
+        self.assertEqual(bucket.rate, 1.25)
+        bucket.increase(1)
+        self.assertEqual(bucket.rate, 1.5)
+
+    def test_multiplicative_decrease_down_to_min_rate(self):
+        bucket = TokenBucket(rate=1, capacity=5, min_rate=0.2)
+        bucket.decrease(0.5)
+        self.assertEqual(bucket.rate, 0.5)
+        # the burst left is dropped, the next request waits
+        self.assertGreater(bucket.reserve(), 0)
+        for _ in range(5):
+            bucket.decrease(0.5)
+        self.assertEqual(bucket.rate, 0.2)
+
+    def test_pickle(self):
+        bucket = pickle.loads(pickle.dumps(TokenBucket(rate=2, capacity=4)))
+        self.assertEqual((bucket.rate, bucket.capacity), (2, 4))
+        self.assertEqual(bucket.reserve(), 0.0)
+
+
+class TestAdaptiveRateLimiter(TestCase):
+
+    def test_endpoint_family(self):
+        self.assertEqual(get_endpoint_family(PRICE_URL), 'priceoverview')
+        self.assertEqual(get_endpoint_family(INVENTORY_URL), 'inventory')
+        self.assertEqual(get_endpoint_family('https://steamcommunity.com/tradeoffer/new/send'), 'tradeoffer')
+        self.assertEqual(get_endpoint_family('https://store.steampowered.com/'), 'default')
+
+    def test_unlimited_family(self):
+        rate_limiter = AdaptiveRateLimiter()
+        self.assertEqual([rate_limiter.reserve('https://store.steampowered.com/') for _ in range(100)], [0.0] * 100)
+        rate_limiter.on_response('https://store.steampowered.com/', 429)
+        self.assertNotIn('default', rate_limiter.rates)
+
+    def test_aimd_per_family(self):
+        rate_limiter = AdaptiveRateLimiter({'priceoverview': (1, 1), 'inventory': (1, 1)}, decrease_factor=0.5,
+                                           increase_ratio=0.1)
+        rate_limiter.on_response(PRICE_URL, 429)
+        self.assertEqual(rate_limiter.rates, {'priceoverview': 0.5, 'inventory': 1})
+        rate_limiter.on_response(PRICE_URL, 200)
+        rate_limiter.on_response(PRICE_URL, 200)
+        self.assertAlmostEqual(rate_limiter.rates['priceoverview'], 0.7)
+        for _ in range(20):
+            rate_limiter.on_response(INVENTORY_URL, 200)
+        self.assertEqual(rate_limiter.rates['inventory'], 2)
+
+    def test_set_rate(self):
+        rate_limiter = AdaptiveRateLimiter({'inventory': (1, 1)})
+        rate_limiter.set_rate('inventory', 4, burst=2)
+        rate_limiter.set_rate('priceoverview', 0.5, burst=2)
+        self.assertEqual(rate_limiter.rates, {'inventory': 4, 'priceoverview': 0.5})
+        self.assertEqual(rate_limiter.buckets['inventory'].capacity, 2)
+        self.assertEqual([rate_limiter.reserve(PRICE_URL) for _ in range(2)], [0.0, 0.0])
+        self.assertAlmostEqual(rate_limiter.reserve(PRICE_URL), 2, delta=0.01)
+
+    def test_backoff(self):
+        rate_limiter = AdaptiveRateLimiter(backoff_base=1, backoff_cap=5)
+        self.assertEqual(rate_limiter.backoff(0, '7'), 7)
+        for attempt in range(10):
+            self.assertLessEqual(rate_limiter.backoff(attempt), min(5, 2 ** attempt))
+            self.assertLessEqual(rate_limiter.backoff(attempt, 'Wed, 21 Oct 2015 07:28:00 GMT'), 5)